@@ -0,0 +1,220 @@
+import asyncio
+import collections
+import os
+import time
+
+# ==========================================
+# 🚦 ADMISSION CONTROL
+# ==========================================
+"""
+Protects the server when lots of people click at once (e.g. after a game outage).
+
+- Caps how many tickets can be open at the same time, per server and per
+  ticket type.
+- Limits how fast new ticket channels are created (a token bucket).
+- Everyone over the limit waits in a first-come, first-served queue and is
+  told their position and an estimated wait.
+
+Every limit is off (0) by default, so normal traffic is never slowed
+down. Turn them on for servers that get big rushes.
+"""
+
+# Most tickets open at the same time in one server (0 = no limit)
+MAX_OPEN_TICKETS = int(os.getenv('MAX_OPEN_TICKETS', 0))
+
+# Most tickets of one type open at the same time in one server (0 = no limit)
+MAX_OPEN_PER_TYPE = int(os.getenv('MAX_OPEN_PER_TYPE', 0))
+
+# Channel creation speed: CREATE_RATE new tickets per second, bursts of up to CREATE_BURST (0 = no limit)
+CREATE_RATE = float(os.getenv('CREATE_RATE', 0))
+CREATE_BURST = int(os.getenv('CREATE_BURST', 5))
+
+# Most people waiting in line per server, and how long they may wait (seconds).
+# Discord only lets us answer a button click for 15 minutes.
+MAX_QUEUE = int(os.getenv('MAX_QUEUE', 500))
+MAX_QUEUE_WAIT = int(os.getenv('MAX_QUEUE_WAIT', 10 * 60))
+
+
+def below(count, limit):
+    """True if `count` is under `limit` (a limit of 0 means no limit)."""
+    return limit <= 0 or count < limit
+
+
+class QueueFull(Exception):
+    """Raised when the waiting line is full or the wait took too long."""
+
+
+class TokenBucket:
+    """Allows `rate` actions per second, with bursts of up to `capacity`."""
+    def __init__(self, rate=CREATE_RATE, capacity=CREATE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until the next token is available."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    async def acquire(self):
+        while True:
+            delay = self.wait_time()
+            if delay <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(delay)
+
+
+class TicketSlot:
+    """An admitted ticket. Call `release()` when the ticket is closed."""
+    def __init__(self, controller, guild_id, ticket_type):
+        self.controller = controller
+        self.guild_id = guild_id
+        self.ticket_type = ticket_type
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller.release(self)
+
+
+class AdmissionController:
+    """
+    Open-ticket caps, creation rate limit and a fair waiting line, per server.
+    """
+    def __init__(self, max_open=MAX_OPEN_TICKETS, max_per_type=MAX_OPEN_PER_TYPE, max_queue=MAX_QUEUE,
+                 create_rate=CREATE_RATE, create_burst=CREATE_BURST):
+        self.max_open = max_open
+        self.max_per_type = max_per_type
+        self.max_queue = max_queue
+        self.create_rate = create_rate
+        self.create_burst = create_burst
+
+        self.open = collections.Counter()  # guild_id and (guild_id, ticket_type): open tickets
+        self.queues = {}                   # guild_id: deque of [ticket_type, future]
+        self.buckets = {}                  # guild_id: TokenBucket
+
+        # Average time a ticket stays open, for the wait estimate (starts at 2 minutes)
+        self.avg_ticket_seconds = 120.0
+
+        # Counters
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def has_room(self, guild_id, ticket_type):
+        return below(self.open[guild_id], self.max_open) and below(self.open[(guild_id, ticket_type)], self.max_per_type)
+
+    def claim(self, guild_id, ticket_type):
+        """Takes a slot right away, even over the limit (used for resumed interviews)."""
+        self.open[guild_id] += 1
+        self.open[(guild_id, ticket_type)] += 1
+        self.admitted += 1
+        return TicketSlot(self, guild_id, ticket_type)
+
+    def estimate_wait(self, guild_id, position):
+        """Rough guess (seconds) for someone at `position` in the line."""
+        rate_wait = position / self.create_rate if self.create_rate > 0 else 0.0
+        cap_wait = position * self.avg_ticket_seconds / max(1, self.max_open)
+        return max(rate_wait, cap_wait)
+
+    async def admit(self, guild_id, ticket_type, on_queued=None):
+        """
+        Waits for a free slot and a channel-creation token. Returns a TicketSlot.
+        `on_queued(position, eta_seconds)` is awaited if the user has to wait in line.
+        Raises QueueFull if the line is full or the wait takes too long.
+        """
+        queue = self.queues.setdefault(guild_id, collections.deque())
+
+        # Only people waiting for the same type get to go first: if this type has
+        # room, someone stuck behind a full type must not hold this click back
+        if self.has_room(guild_id, ticket_type) and not any(waiter[0] == ticket_type for waiter in queue):
+            slot = self.claim(guild_id, ticket_type)
+        else:
+            if len(queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull()
+
+            waiter = [ticket_type, asyncio.get_running_loop().create_future()]
+            queue.append(waiter)
+            self.queued += 1
+            try:
+                if on_queued is not None:
+                    position = len(queue)
+                    await on_queued(position, self.estimate_wait(guild_id, position))
+                slot = await asyncio.wait_for(asyncio.shield(waiter[1]), MAX_QUEUE_WAIT)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                self._give_up(guild_id, waiter)
+                raise QueueFull()
+            except BaseException:
+                self._give_up(guild_id, waiter)
+                raise
+
+        # Respect the channel creation speed limit
+        if self.create_rate <= 0:
+            return slot
+        bucket = self.buckets.get(guild_id)
+        if bucket is None:
+            bucket = self.buckets[guild_id] = TokenBucket(self.create_rate, self.create_burst)
+        try:
+            await bucket.acquire()
+        except BaseException:
+            slot.release()
+            raise
+        return slot
+
+    def _give_up(self, guild_id, waiter):
+        """Removes a waiter from the line (or hands back a slot it just got)."""
+        future = waiter[1]
+        if future.done() and not future.cancelled():
+            future.result().release()
+            return
+        future.cancel()
+        try:
+            self.queues[guild_id].remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, slot):
+        """Frees the slot and lets the next people in line through."""
+        self.open[slot.guild_id] -= 1
+        self.open[(slot.guild_id, slot.ticket_type)] -= 1
+        held = time.monotonic() - slot.admitted_at
+        self.avg_ticket_seconds = 0.9 * self.avg_ticket_seconds + 0.1 * held
+        self._wake(slot.guild_id)
+
+    def _wake(self, guild_id):
+        """Admits waiters in arrival order. A waiter whose type is full doesn't block other types."""
+        queue = self.queues.get(guild_id)
+        if not queue:
+            return
+        for waiter in list(queue):
+            if not below(self.open[guild_id], self.max_open):
+                break
+            ticket_type, future = waiter
+            if future.done():
+                queue.remove(waiter)
+                continue
+            if self.has_room(guild_id, ticket_type):
+                queue.remove(waiter)
+                future.set_result(self.claim(guild_id, ticket_type))
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "open_tickets": sum(v for k, v in self.open.items() if not isinstance(k, tuple)),
+            "queue_depth": sum(len(q) for q in self.queues.values()),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "avg_ticket_seconds": self.avg_ticket_seconds,
+        }
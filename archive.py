@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import time
+
+# ==========================================
+# 🗄️ REPORT ARCHIVE
+# ==========================================
+"""
+Keeps a copy of every submitted report in a local SQLite file, so
+moderators can find old reports with !search instead of scrolling
+through the log channels.
+
+- The columns people filter on (server, ticket type, Player ID, in-game
+  name, time) are indexed.
+- The free-text answers go into an FTS5 full-text index, so a keyword
+  search over thousands of reports takes milliseconds.
+- Each report also keeps its duplicate-detector signature (see dedup.py)
+  and, for originals, the thread where similar reports are collected.
+"""
+
+# Where the reports are saved. Can be changed with an Environment Variable.
+ARCHIVE_DB = os.getenv('ARCHIVE_DB', 'reports.db')
+
+# Results per !search page
+SEARCH_PAGE_SIZE = 5
+
+# Answers that are copied into their own indexed column
+PLAYER_ID_FIELD = "Player ID"
+NAME_FIELD = "In-Game Name"
+
+# Filters understood by !search, e.g. "type:bug player:12345678 name:frosty"
+SEARCH_FILTERS = ("type", "player", "name", "page")
+
+
+def fts_query(words):
+    """
+    Turns the typed words into a safe FTS5 query: every word is quoted, so
+    characters like - or * can't break the search. A trailing * is kept
+    for prefix searches ("crash*" finds "crashes").
+    """
+    terms = []
+    for word in words:
+        prefix = word.endswith("*") and len(word) > 1
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def parse_search(text):
+    """
+    "type:bug crash lag page:2" -> ({"type": "bug", "page": "2"}, ["crash", "lag"])
+    """
+    filters = {}
+    words = []
+    for token in text.split():
+        key, sep, value = token.partition(":")
+        if sep and key.lower() in SEARCH_FILTERS and value:
+            filters[key.lower()] = value
+        else:
+            words.append(token)
+    return filters, words
+
+
+class ReportArchive:
+    """
+    One row per submitted report, plus a full-text index of the answers.
+    """
+    def __init__(self, path=ARCHIVE_DB):
+        self.db = sqlite3.connect(path, isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                ticket_type TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                user_name TEXT NOT NULL,
+                player_id TEXT,
+                in_game_name TEXT,
+                submitted_at REAL NOT NULL,
+                log_guild_id INTEGER,
+                log_channel_id INTEGER,
+                log_message_id INTEGER,
+                answers TEXT NOT NULL,
+                signature BLOB,
+                duplicate_of INTEGER,
+                thread_id INTEGER,
+                duplicates INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(reports)")}
+        for column, kind in (("signature", "BLOB"), ("duplicate_of", "INTEGER"), ("thread_id", "INTEGER"), ("duplicates", "INTEGER NOT NULL DEFAULT 0")):
+            if column not in columns:  # Files saved before duplicate detection existed
+                self.db.execute(f"ALTER TABLE reports ADD COLUMN {column} {kind}")
+        self.db.execute("CREATE INDEX IF NOT EXISTS reports_by_type ON reports (guild_id, ticket_type, submitted_at)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS reports_by_player ON reports (player_id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS reports_by_name ON reports (in_game_name COLLATE NOCASE)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS reports_by_log_guild ON reports (log_guild_id, submitted_at)")
+        # Full-text index of the free-text answers (rowid = report id)
+        self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS report_text USING fts5(body, tokenize='unicode61 remove_diacritics 2')")
+
+        # Counters
+        self.added = 0
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    def add(self, guild_id, ticket_type, user, answers, log_message=None, text_fields=None, signature=None, duplicate_of=None):
+        """
+        Archives a submitted report. `answers` is {field: answer}; only the
+        `text_fields` (default: all) go into the full-text index.
+        `signature` and `duplicate_of` come from the duplicate detector.
+        Returns the report number.
+        """
+        log_channel = getattr(log_message, "channel", None)
+        log_guild = getattr(log_channel, "guild", None)
+        text_fields = answers.keys() if text_fields is None else text_fields
+        body = "\n".join(f"{field}: {answers[field]}" for field in text_fields if field in answers)
+
+        with self.db:
+            self.db.execute("BEGIN")
+            cursor = self.db.execute(
+                "INSERT INTO reports (guild_id, ticket_type, user_id, user_name, player_id, in_game_name,"
+                " submitted_at, log_guild_id, log_channel_id, log_message_id, answers, signature, duplicate_of)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    guild_id, ticket_type, user.id, str(user),
+                    answers.get(PLAYER_ID_FIELD), answers.get(NAME_FIELD), time.time(),
+                    getattr(log_guild, "id", None), getattr(log_channel, "id", None), getattr(log_message, "id", None),
+                    json.dumps(answers), signature.tobytes() if signature is not None else None, duplicate_of,
+                )
+            )
+            report_id = cursor.lastrowid
+            self.db.execute("INSERT INTO report_text (rowid, body) VALUES (?, ?)", (report_id, body))
+        self.added += 1
+        return report_id
+
+    def search(self, guild_id, words=(), ticket_type=None, player_id=None, name=None, page=1, page_size=SEARCH_PAGE_SIZE):
+        """
+        Finds reports filed in (or logged to) a server, newest first
+        (report numbers only go up, so the newest report has the highest).
+        Returns (total matches, [report dictionaries]) for one page.
+        Each report has a "snippet" with the matching words in bold.
+        """
+        started = time.perf_counter()
+        where = ["(r.guild_id = ? OR r.log_guild_id = ?)"]
+        params = [guild_id, guild_id]
+        if ticket_type:
+            where.append("r.ticket_type = ? COLLATE NOCASE")
+            params.append(ticket_type)
+        if player_id:
+            where.append("r.player_id = ?")
+            params.append(player_id)
+        if name:
+            where.append("r.in_game_name = ? COLLATE NOCASE")
+            params.append(name)
+
+        query = fts_query(words)
+        if query:
+            source = "report_text JOIN reports r ON r.id = report_text.rowid"
+            where.append("report_text MATCH ?")
+            params.append(query)
+            snippet = "snippet(report_text, 0, '**', '**', '…', 12)"
+            newest_first = "report_text.rowid DESC"  # Lets FTS5 walk its index backwards
+        else:
+            source = "reports r"
+            snippet = "NULL"
+            newest_first = "r.id DESC"
+        condition = " AND ".join(where)
+
+        total = self.db.execute(f"SELECT COUNT(*) FROM {source} WHERE {condition}", params).fetchone()[0]
+        rows = self.db.execute(
+            f"SELECT r.id, r.guild_id, r.ticket_type, r.user_name, r.player_id, r.in_game_name, r.submitted_at,"
+            f" r.log_guild_id, r.log_channel_id, r.log_message_id, {snippet}"
+            f" FROM {source} WHERE {condition} ORDER BY {newest_first} LIMIT ? OFFSET ?",
+            params + [page_size, (max(1, page) - 1) * page_size]
+        ).fetchall()
+
+        columns = ("id", "guild_id", "ticket_type", "user_name", "player_id", "in_game_name", "submitted_at",
+                   "log_guild_id", "log_channel_id", "log_message_id", "snippet")
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - started
+        return total, [dict(zip(columns, row)) for row in rows]
+
+    def original(self, report_id):
+        """Where the log message (and similar-reports thread) of a report is, or None."""
+        row = self.db.execute(
+            "SELECT log_channel_id, log_message_id, thread_id, duplicates FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("log_channel_id", "log_message_id", "thread_id", "duplicates"), row), id=report_id)
+
+    def set_thread(self, report_id, thread_id):
+        self.db.execute("UPDATE reports SET thread_id = ? WHERE id = ?", (thread_id, report_id))
+
+    def count_duplicate(self, report_id):
+        """Adds one to the similar-reports counter of an original. Returns the new count."""
+        self.db.execute("UPDATE reports SET duplicates = duplicates + 1 WHERE id = ?", (report_id,))
+        return self.db.execute("SELECT duplicates FROM reports WHERE id = ?", (report_id,)).fetchone()[0]
+
+    def recent_signatures(self, since):
+        """
+        Yields (report_id, guild_id, ticket_type, signature bytes, duplicate_of, submitted_at)
+        for reports submitted after `since`, oldest first.
+        """
+        return self.db.execute(
+            "SELECT id, guild_id, ticket_type, signature, duplicate_of, submitted_at FROM reports"
+            " WHERE submitted_at > ? AND signature IS NOT NULL ORDER BY id", (since,)
+        )
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "added": self.added,
+            "searches": self.searches,
+            "avg_search_seconds": self.search_seconds / self.searches if self.searches else 0.0,
+        }
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,427 @@
+"""
+An offline, in-process stand-in for the parts of Discord the bot uses.
+
+- REST: channel create/edit/delete, message send, interaction responses,
+  with call counting and optional rate limits (per route and bucket).
+- Gateway: delivers user messages to the bot's interview router, like a
+  MESSAGE_CREATE event would.
+- CDN: a tiny local aiohttp server that serves attachment bytes, so the
+  evidence relay streams real downloads without touching the internet.
+
+Only the attributes and methods that bot.py actually touches are implemented.
+"""
+import asyncio
+import collections
+import datetime
+import hashlib
+import itertools
+import re
+import time
+import types
+
+import discord
+from aiohttp import web
+
+# Rough Discord limits: (calls, per seconds) for each route, counted per bucket
+DISCORD_LIMITS = {
+    "send_message": (5, 5.0),       # Per channel
+    "create_channel": (10, 10.0),   # Per guild
+    "edit_channel": (10, 10.0),     # Per guild
+    "delete_channel": (10, 10.0),   # Per guild
+}
+
+MENTION = re.compile(r"<#(\d+)>")
+
+
+class FakeHTTPResponse:
+    """Just enough of an aiohttp response for discord.HTTPException."""
+    def __init__(self, status, reason, headers=None):
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+
+class FakeRest:
+    """
+    Counts every REST call and applies (optional) fixed-window rate limits.
+    With `raise_429=True` a rate-limited call raises an HTTP 429 error;
+    otherwise it waits, like discord.py does internally.
+    """
+    def __init__(self, rate_limits=False, raise_429=False, latency=0.0):
+        self.limits = DISCORD_LIMITS if rate_limits else {}
+        self.raise_429 = raise_429
+        self.latency = latency
+        self.windows = {}  # (route, bucket): [window start, calls]
+
+        self.calls = collections.Counter()  # route: number of calls
+        self.rate_limited = 0
+        self.bytes_uploaded = 0
+        self.empty_files = 0  # Files that arrived with no bytes (e.g. not rewound before a retry)
+
+    async def call(self, route, bucket):
+        self.calls[route] += 1
+
+        limit = self.limits.get(route)
+        while limit is not None:
+            calls, per = limit
+            now = time.monotonic()
+            window = self.windows.get((route, bucket))
+            if window is None or now - window[0] >= per:
+                window = self.windows[(route, bucket)] = [now, 0]
+            if window[1] < calls:
+                window[1] += 1
+                break
+
+            self.rate_limited += 1
+            retry_after = per - (now - window[0])
+            if self.raise_429:
+                raise discord.HTTPException(FakeHTTPResponse(429, "Too Many Requests", {"Retry-After": str(retry_after)}), {"message": "You are being rate limited.", "retry_after": retry_after})
+            await asyncio.sleep(retry_after)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+
+class FakeAttachment:
+    def __init__(self, id, url, filename, size):
+        self.id = id
+        self.url = url
+        self.filename = filename
+        self.size = size
+
+
+class FakeMessage:
+    def __init__(self, id, channel, author, content=None, embed=None, view=None, attachments=()):
+        self.id = id
+        self.channel = channel
+        self.author = author
+        self.content = content or ""
+        self.embed = embed
+        self.view = view
+        self.attachments = list(attachments)
+        self.created_at = time.perf_counter()
+
+    @property
+    def jump_url(self):
+        guild = getattr(self.channel, "guild", None)
+        return f"https://discord.com/channels/{getattr(guild, 'id', '@me')}/{self.channel.id}/{self.id}"
+
+
+class FakePartialMessage:
+    """A message known only by its id (what channel.get_partial_message returns)."""
+    def __init__(self, channel, id):
+        self.channel = channel
+        self.id = id
+
+    async def edit(self, content=None, **kwargs):
+        await self.channel.gateway.rest.call("edit_message", self.channel.id)
+        self.channel.edits[self.id] = content
+
+    async def create_thread(self, name, **kwargs):
+        await self.channel.gateway.rest.call("create_thread", self.channel.id)
+        gateway = self.channel.gateway
+        thread = FakeTextChannel(gateway, gateway.next_id(), name, self.channel.guild)
+        gateway.channels[thread.id] = thread
+        return thread
+
+
+class FakeRole:
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+class FakeMember:
+    def __init__(self, id, name, guild, roles=(), administrator=False):
+        self.id = id
+        self.name = name
+        self.guild = guild
+        self.bot = False
+        self.mention = f"<@{id}>"
+        self.roles = list(roles)
+        self.guild_permissions = types.SimpleNamespace(administrator=administrator)
+        self.display_avatar = types.SimpleNamespace(url=f"https://cdn.invalid/avatars/{id}.png")
+
+    def __str__(self):
+        return self.name
+
+
+class FakeTextChannel:
+    def __init__(self, gateway, id, name, guild, category=None):
+        self.gateway = gateway
+        self.id = id
+        self.name = name
+        self.guild = guild
+        self.category = category
+        self.mention = f"<#{id}>"
+        self.created_at = discord.utils.snowflake_time(id)
+        self.last_message_id = None
+        self.deleted = False
+
+        # Everything the bot sends here, for the virtual user to read
+        self.inbox = asyncio.Queue()
+        self.edits = {}  # message id: latest content set by an edit
+
+    async def send(self, content=None, *, embed=None, view=None, file=None, files=None, **kwargs):
+        # Like the real API, the files are uploaded before the answer (maybe a 429) comes back
+        rest = self.gateway.rest
+        for f in ([file] if file else []) + list(files or []):
+            size = 0
+            while True:
+                chunk = f.fp.read(64 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+            rest.bytes_uploaded += size
+            rest.empty_files += size == 0
+
+        await rest.call("send_message", self.id)
+        if self.deleted:
+            raise discord.NotFound(FakeHTTPResponse(404, "Not Found"), "Unknown Channel")
+
+        message = FakeMessage(self.gateway.next_id(), self, self.guild.me, content, embed, view)
+        self.last_message_id = message.id
+        self.inbox.put_nowait(message)
+        return message
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self, message_id)
+
+    async def edit(self, *, name=None, overwrites=None, category=None, sync_permissions=False, **kwargs):
+        await self.gateway.rest.call("edit_channel", self.guild.id)
+        if name is not None:
+            self.name = name
+        if category is not None:
+            self.guild.move(self, category)
+        return self
+
+    async def delete(self):
+        await self.gateway.rest.call("delete_channel", self.guild.id)
+        if self.deleted:
+            raise discord.NotFound(FakeHTTPResponse(404, "Not Found"), "Unknown Channel")
+        self.deleted = True
+        self.guild.remove(self)
+        self.inbox.put_nowait(None)  # Tells the virtual user the channel is gone
+
+
+class FakeCategory:
+    def __init__(self, id, name, guild):
+        self.id = id
+        self.name = name
+        self.guild = guild
+        self.text_channels = []
+
+
+class FakeGuild:
+    def __init__(self, gateway, id, name):
+        self.gateway = gateway
+        self.id = id
+        self.name = name
+        self.owner_id = 0
+        self.default_role = FakeRole(id, "@everyone")
+        self.me = FakeMember(gateway.next_id(), "Whitey", self)
+        self.channels = {}
+        self.members = {}
+
+    @property
+    def categories(self):
+        return [c for c in self.channels.values() if isinstance(c, FakeCategory)]
+
+    @property
+    def text_channels(self):
+        return [c for c in self.channels.values() if isinstance(c, FakeTextChannel)]
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+    async def fetch_member(self, user_id):
+        await self.gateway.rest.call("get_member", self.id)
+        member = self.members.get(user_id)
+        if member is None:
+            raise discord.NotFound(FakeHTTPResponse(404, "Not Found"), "Unknown Member")
+        return member
+
+    async def create_category(self, name, **kwargs):
+        await self.gateway.rest.call("create_channel", self.id)
+        category = FakeCategory(self.gateway.next_id(), name, self)
+        self.channels[category.id] = category
+        return category
+
+    async def create_text_channel(self, name, *, category=None, overwrites=None, **kwargs):
+        await self.gateway.rest.call("create_channel", self.id)
+        channel = FakeTextChannel(self.gateway, self.gateway.next_id(), name, self, category)
+        self.channels[channel.id] = channel
+        self.gateway.channels[channel.id] = channel
+        if category is not None:
+            category.text_channels.append(channel)
+        return channel
+
+    def move(self, channel, category):
+        if channel.category is not None:
+            channel.category.text_channels.remove(channel)
+        channel.category = category
+        category.text_channels.append(channel)
+
+    def remove(self, channel):
+        self.channels.pop(channel.id, None)
+        self.gateway.channels.pop(channel.id, None)
+        if channel.category is not None and channel in channel.category.text_channels:
+            channel.category.text_channels.remove(channel)
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def _respond(self):
+        await self.interaction.gateway.rest.call("interaction_response", self.interaction.id)
+        self.done = True
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond()
+        self.interaction.replies.put_nowait(content)
+
+    async def send_modal(self, modal):
+        await self._respond()
+        self.interaction.modals.put_nowait(modal)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.gateway.rest.call("followup", self.interaction.id)
+        self.interaction.replies.put_nowait(content)
+
+
+class FakeInteraction:
+    """A button click (or form submit) by a member."""
+    def __init__(self, gateway, user, guild, channel=None):
+        self.gateway = gateway
+        self.id = gateway.next_id()
+        self.user = user
+        self.guild = guild
+        self.channel = channel
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+
+        # What the bot answered, for the virtual user to read
+        self.replies = asyncio.Queue()
+        self.modals = asyncio.Queue()
+
+    async def wait_for_channel(self, timeout=60):
+        """Waits for the "Engineering Bay Opened!" reply and returns the ticket channel."""
+        while True:
+            reply = await asyncio.wait_for(self.replies.get(), timeout)
+            match = MENTION.search(reply or "")
+            if match:
+                return self.gateway.channels[int(match.group(1))]
+
+
+class FakeCDN:
+    """
+    Serves attachment bytes from localhost: /attachments/<size>/<content>/<id>/<filename>
+    Every upload gets its own link (like Discord), but the same <content> gives the same bytes.
+    """
+    def __init__(self, port=0):
+        self.port = port
+        self.runner = None
+        self.bytes_served = 0
+
+    async def start(self):
+        async def serve(request):
+            size = int(request.match_info["size"])
+            block = hashlib.md5(request.match_info["content"].encode()).digest() * 4096
+            response = web.StreamResponse(headers={"Content-Length": str(size)})
+            await response.prepare(request)
+            while size > 0:
+                chunk = block[:size]
+                await response.write(chunk)
+                size -= len(chunk)
+                self.bytes_served += len(chunk)
+            await response.write_eof()
+            return response
+
+        app = web.Application()
+        app.router.add_get("/attachments/{size}/{content}/{id}/{filename}", serve)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def url(self, size, filename, content, id):
+        return f"http://127.0.0.1:{self.port}/attachments/{size}/{content}/{id}/{filename}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class FakeGateway:
+    """
+    Owns the fake servers and channels and delivers user messages to the bot.
+    """
+    def __init__(self, rest, cdn, deliver, first_id=None, id_step=1):
+        self.rest = rest
+        self.cdn = cdn
+        self.deliver = deliver  # Coroutine called with every user message (the bot's on_message)
+        self.channels = {}      # Every channel in every fake server, by id
+
+        # Several gateways (one per bot process) hand out interleaved ids, so they never collide
+        if first_id is None:
+            first_id = discord.utils.time_snowflake(datetime.datetime.now(datetime.timezone.utc))
+        self.ids = itertools.count(first_id, id_step)
+        self.messages_delivered = 0
+
+    def next_id(self):
+        return next(self.ids)
+
+    def create_guild(self, name="Whiteout Alliance"):
+        return FakeGuild(self, self.next_id(), name)
+
+    def add_log_channel(self, guild, channel_id, name):
+        channel = FakeTextChannel(self, channel_id, name, guild)
+        guild.channels[channel_id] = channel
+        self.channels[channel_id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def create_member(self, guild, name):
+        member = FakeMember(self.next_id(), name, guild)
+        guild.members[member.id] = member
+        return member
+
+    def attachment(self, size, filename, content=None):
+        """A file uploaded by a member. Files with the same `content` have the same bytes."""
+        id = self.next_id()
+        return FakeAttachment(id, self.cdn.url(size, filename, content or id, id), filename, size)
+
+    async def user_message(self, channel, author, content="", attachments=()):
+        """A member types a message: the MESSAGE_CREATE event reaches the bot."""
+        message = FakeMessage(self.next_id(), channel, author, content, attachments=attachments)
+        channel.last_message_id = message.id
+        self.messages_delivered += 1
+        await self.deliver(message)
+        return message
+
+    async def click(self, view, item, interaction):
+        """A member clicks a button: runs the view's checks and the button callback."""
+        if await view.interaction_check(interaction):
+            await item.callback(interaction)
@@ -0,0 +1,368 @@
+"""
+Offline load test for the ticket pipeline.
+
+Spins up the real bot code (bot.py) against the fake Discord in
+bench/fake_discord.py and lets N scripted virtual users click a ticket
+button, answer every question, sometimes type an invalid Player ID, revise
+a field, upload files and submit, all at the same time.
+
+Reports throughput, p50/p99 latency for each interview stage, REST calls per
+ticket and memory use. Needs no network and no Discord token.
+
+Usage:
+    python bench/loadtest.py --users 500
+    python bench/loadtest.py --users 200 --rate-limits --raise-429 --modal
+    python bench/loadtest.py --users 300 --max-open 40 --create-rate 20
+    python bench/loadtest.py --users 500 --guilds 10
+"""
+import argparse
+import asyncio
+import collections
+import csv
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+# Keep the bot's SQLite files and evidence cache out of the repo (deleted on exit)
+_state_dir = tempfile.mkdtemp(prefix="whitey-bench-")
+os.environ.setdefault("COOLDOWN_DB", os.path.join(_state_dir, "cooldowns.db"))
+os.environ.setdefault("CHECKPOINT_DB", os.path.join(_state_dir, "interviews.db"))
+os.environ.setdefault("ARCHIVE_DB", os.path.join(_state_dir, "reports.db"))
+os.environ.setdefault("ROSTER_FILE", os.path.join(_state_dir, "roster.csv"))
+os.environ.setdefault("EVIDENCE_DB", os.path.join(_state_dir, "evidence.db"))
+os.environ.setdefault("EVIDENCE_DIR", os.path.join(_state_dir, "evidence"))
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bot as whitey  # noqa: E402
+from fake_discord import FakeCDN, FakeGateway, FakeInteraction, FakeRest  # noqa: E402
+from metrics import STAGE_SECONDS  # noqa: E402
+from admission import CREATE_BURST, CREATE_RATE, MAX_OPEN_TICKETS  # noqa: E402
+from pool import POOL_SIZE  # noqa: E402
+
+TICKET_BUTTONS = {"Bug": "bug_btn", "Suggestion": "suggest_btn", "Complaint": "complaint_btn"}
+
+# Free-text answers: random words, or (for --duplicate-rate) one of a few
+# issues "everyone" reports after a patch, with small differences
+WORDS = ("furnace chief hero beast rally shop gems troops march city alliance event arena "
+         "chest reward login screen button lag freeze crash upgrade research pet map tile").split()
+KNOWN_ISSUES = (
+    "After the latest patch the game crashes every time I open the furnace upgrade screen",
+    "The alliance chest rewards are not showing up since the update this morning",
+    "Rally button does nothing when I try to join the beast hunt after the maintenance",
+)
+
+# Screenshots many users share (--shared-evidence-rate): (size, filename, content)
+KNOWN_SCREENSHOTS = ((850_000, "patch_crash.png", "known-crash"), (420_000, "chest.png", "known-chest"), (1_300_000, "rally.png", "known-rally"))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Results:
+    def __init__(self):
+        self.stages = collections.defaultdict(list)  # stage: [seconds]
+        self.completed = 0
+        self.failed = 0
+        self.errors = collections.Counter()
+
+    def record(self, stage, seconds):
+        self.stages[stage].append(seconds)
+
+
+class VirtualUser:
+    """
+    One scripted member filing one ticket from button click to submit.
+    """
+    def __init__(self, gateway, guild, number, rng, results, typo_rate, revise_rate, attachment_rate, duplicate_rate, shared_evidence_rate, timeout):
+        self.gateway = gateway
+        self.timeout = timeout
+        self.guild = guild
+        self.member = gateway.create_member(guild, f"survivor{number}")
+        self.ticket_type = rng.choice(list(TICKET_BUTTONS))
+        self.rng = rng
+        self.results = results
+        self.typo = rng.random() < typo_rate
+        self.revise = rng.random() < revise_rate
+        self.attach = rng.random() < attachment_rate
+        if rng.random() < shared_evidence_rate:
+            self.evidence = [rng.choice(KNOWN_SCREENSHOTS)]
+        else:
+            self.evidence = [(rng.randint(50_000, 2_000_000), f"proof{i}.png", f"user{number}-{i}") for i in range(rng.randint(1, 3))]
+        self.duplicate = rng.random() < duplicate_rate
+        self.player_id = str(rng.randint(10_000_000, 99_999_999))
+        self.others = ()  # Roster names to complain about (with --roster)
+        self.channel = None
+
+    def answer_for(self, field):
+        """Returns (text, attachments) for a question."""
+        if field in whitey.ATTACHMENT_FIELDS:
+            if self.attach:
+                # Uploading again (when revising) sends the same files under new links
+                return "", [self.gateway.attachment(size, filename, content) for size, filename, content in self.evidence]
+            return "no", []
+        if field == "Player ID":
+            if self.typo:
+                self.typo = False
+                if len(whitey.bot.roster):  # A digit off, caught by the roster
+                    return self.player_id[:-1] + str((int(self.player_id[-1]) + 1) % 10), []
+                return "12345abc", []
+            return self.player_id, []
+        if field == "In-Game Name":
+            return self.member.name, []
+        if field == "Offender Name" and self.others:
+            return self.rng.choice(self.others), []
+        if field in whitey.DEDUP_FIELDS:
+            if self.duplicate:
+                return self.rng.choice(KNOWN_ISSUES) + self.rng.choice(("", "!!", " pls fix", " on my phone")), []
+            return " ".join(self.rng.choice(WORDS) for _ in range(15)), []
+        return f"{field} answer from {self.member.name}", []
+
+    async def say(self, field):
+        text, files = self.answer_for(field)
+        await self.gateway.user_message(self.channel, self.member, text, files)
+
+    async def fill_form(self, intake):
+        """Opens and submits every page of the pop-up form."""
+        while True:
+            interaction = FakeInteraction(self.gateway, self.member, self.guild, self.channel)
+            await self.gateway.click(intake, intake.open_form, interaction)
+            modal = await interaction.modals.get()
+            for field, box in modal.inputs.items():
+                box._value = self.answer_for(field)[0]
+            submit = FakeInteraction(self.gateway, self.member, self.guild, self.channel)
+            await modal.on_submit(submit)
+            if intake.is_finished():
+                return
+
+    async def run(self):
+        launcher = whitey.TicketLauncher()
+        button = getattr(launcher, TICKET_BUTTONS[self.ticket_type])
+        interaction = FakeInteraction(self.gateway, self.member, self.guild)
+
+        started = time.perf_counter()
+        ticket = asyncio.create_task(self.gateway.click(launcher, button, interaction))
+        current_field = None
+        revised = False
+        confirmed_at = None
+        try:
+            opened = asyncio.create_task(interaction.wait_for_channel(self.timeout))
+            await asyncio.wait({ticket, opened}, return_when=asyncio.FIRST_COMPLETED)
+            if not opened.done():
+                opened.cancel()
+                ticket.result()  # Raises the error that stopped the ticket
+                raise RuntimeError("Ticket finished without opening a channel")
+            self.channel = opened.result()
+            self.results.record("ticket_created", time.perf_counter() - started)
+
+            last_action = time.perf_counter()
+            while True:
+                message = await asyncio.wait_for(self.channel.inbox.get(), self.timeout)
+                if message is None:
+                    break  # Channel deleted: the ticket is over
+                waited = time.perf_counter() - last_action
+                content = message.content
+
+                if isinstance(message.view, whitey.TicketControls):
+                    self.results.record("intro", waited)
+                elif isinstance(message.view, whitey.IntakeView):
+                    await self.fill_form(message.view)
+                    self.results.record("form", time.perf_counter() - last_action)
+                elif content.startswith("🔹 **"):
+                    self.results.record("question", waited)
+                    current_field = content[len("🔹 **"):].split(":**")[0]
+                    await self.say(current_field)
+                elif content.startswith("⚠️ **Invalid") or "not on the alliance roster" in content:
+                    self.results.record("validation", waited)
+                    await self.say(current_field)
+                elif isinstance(message.view, whitey.ConfirmView):
+                    self.results.record("summary", waited)
+                    view = message.view
+                    click = FakeInteraction(self.gateway, self.member, self.guild, self.channel)
+                    if self.revise and not revised:
+                        revised = True
+                        await self.gateway.click(view, view.cancel, click)
+                    else:
+                        confirmed_at = time.perf_counter()
+                        await self.gateway.click(view, view.confirm, click)
+                elif content.startswith("⚠️ **Type the field name"):
+                    self.results.record("revision", waited)
+                    questions = whitey.bot.guild_config.get(self.guild.id).questions[self.ticket_type]
+                    current_field = self.rng.choice([f for f in questions if f != "Player ID"])
+                    await self.gateway.user_message(self.channel, self.member, current_field.lower())
+                elif content.startswith("🔄 Re-enter"):
+                    self.results.record("revision", waited)
+                    await self.say(current_field)
+                elif content.startswith("✅ Submitted"):
+                    self.results.record("submit", time.perf_counter() - confirmed_at)
+                elif content.startswith(("❄️ Frozen", "❌")):
+                    raise RuntimeError(content)
+                else:
+                    continue
+                last_action = time.perf_counter()
+
+            await ticket
+            self.results.record("total", time.perf_counter() - started)
+            self.results.completed += 1
+        except Exception as e:
+            self.results.failed += 1
+            self.results.errors[type(e).__name__] += 1
+            ticket.cancel()
+
+
+async def main(args):
+    whitey.create_bot()
+    rng = random.Random(args.seed)
+    rest = FakeRest(rate_limits=args.rate_limits, raise_429=args.raise_429, latency=args.latency / 1000)
+    cdn = FakeCDN()
+    await cdn.start()
+    worker, workers = (int(n) for n in args.worker.split("/"))
+    gateway = FakeGateway(rest, cdn, whitey.bot.interviews.feed, args.id_base and args.id_base + worker, workers)
+
+    # Point the bot at the fake Discord
+    whitey.bot.get_channel = gateway.get_channel
+    whitey.bot.pool.size = args.pool_size
+    whitey.bot.admission.max_open = args.max_open
+    whitey.bot.admission.create_rate = args.create_rate
+    whitey.bot.admission.create_burst = args.create_burst
+
+    # One bot process serving several servers, each with its own log channels (via guilds.json)
+    guilds = [gateway.create_guild(f"Whiteout Alliance {i + 1}") for i in range(args.guilds)]
+    log_guild = gateway.create_guild("Staff")
+    settings = {"default": {"modal_intake": {t: args.modal for t in TICKET_BUTTONS}}, "guilds": {}}
+    for guild in guilds:
+        log_channels = {}
+        for ticket_type in TICKET_BUTTONS:
+            channel = gateway.add_log_channel(log_guild, gateway.next_id(), f"{ticket_type.lower()}-logs-{guild.id}")
+            log_channels[ticket_type] = channel.id
+        settings["guilds"][str(guild.id)] = {"log_channels": log_channels}
+    config_path = os.path.join(_state_dir, "guilds.json")
+    with open(config_path, "w") as f:
+        json.dump(settings, f)
+    whitey.bot.guild_config.path = config_path
+    whitey.bot.guild_config.reload()
+
+    results = Results()
+    users = [
+        VirtualUser(gateway, guilds[i % len(guilds)], i, rng, results, args.typo_rate, args.revise_rate, args.attachment_rate, args.duplicate_rate, args.shared_evidence_rate, args.timeout)
+        for i in range(args.users)
+    ]
+
+    # The alliance roster: every virtual user (the typos then get "did you mean" hints)
+    if args.roster:
+        roster_path = whitey.bot.roster.path
+        with open(roster_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Player ID", "Name"])
+            writer.writerows((user.player_id, user.member.name) for user in users)
+        whitey.bot.roster.reload()
+        names = [user.member.name for user in users]
+        for user in users:
+            user.others = names
+
+    rss_before = whitey.rss_mb()
+    started = time.perf_counter()
+
+    async def launch(user, delay):
+        await asyncio.sleep(delay)
+        await user.run()
+
+    try:
+        await asyncio.gather(*(launch(u, args.ramp * i / max(1, args.users)) for i, u in enumerate(users)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await whitey.bot.relay.close()
+        await cdn.stop()
+
+    # --- Report ---
+    print(f"\n❄️ Load test: {args.users} users, {elapsed:.2f}s wall time")
+    print(f"   completed {results.completed}, failed {results.failed} {dict(results.errors) or ''}")
+    print(f"   throughput {results.completed / elapsed:.1f} tickets/s")
+    print(f"\n{'stage':<16} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage in ("ticket_created", "intro", "form", "question", "validation", "revision", "summary", "submit", "total"):
+        values = results.stages.get(stage)
+        if values:
+            print(f"{stage:<16} {len(values):>7} {percentile(values, 50) * 1000:>9.1f} {percentile(values, 99) * 1000:>9.1f} {max(values) * 1000:>9.1f}")
+
+    print(f"\nBot-side stage timings (whitey_stage_seconds, estimated from buckets)")
+    print(f"{'stage':<16} {'type':<11} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for key, (count, mean, p50, p99) in sorted(STAGE_SECONDS.breakdown().items()):
+        labels = dict(key)
+        print(f"{labels['stage']:<16} {labels['ticket_type']:<11} {count:>7} {mean * 1000:>9.1f} {p50 * 1000:>9.1f} {p99 * 1000:>9.1f}")
+
+    tickets = max(1, results.completed + results.failed)
+    print(f"\nREST calls: {rest.total} total, {rest.total / tickets:.1f} per ticket, {rest.rate_limited} rate limited")
+    for route, count in rest.calls.most_common():
+        print(f"   {route:<22} {count:>7} ({count / tickets:.1f}/ticket)")
+    print(f"Gateway messages delivered: {gateway.messages_delivered}")
+    print(f"Evidence: {rest.bytes_uploaded / 2**20:.1f} MB uploaded, {rest.empty_files} empty files, relay {whitey.bot.relay.stats()}")
+    print(f"Scheduler: {whitey.bot.outbound.stats()}")
+    print(f"Admission: {whitey.bot.admission.stats()}")
+    print(f"Router: {whitey.bot.interviews.stats()}")
+    print(f"Pool: {whitey.bot.pool.stats()}")
+    print(f"Archive: {len(whitey.bot.archive)} reports, {whitey.bot.archive.stats()}")
+    print(f"Duplicates: {whitey.bot.duplicates.stats()}")
+    print(f"Roster: {whitey.bot.roster.stats()}")
+    print(f"Evidence cache: {whitey.bot.evidence.stats()}")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Memory: RSS {rss_before:.1f} MB -> {whitey.rss_mb():.1f} MB (peak {peak:.1f} MB)")
+
+    if args.json:
+        # One line for bench/shards.py to collect
+        total = results.stages.get("total", [])
+        print("RESULT " + json.dumps({
+            "completed": results.completed,
+            "failed": results.failed,
+            "elapsed": elapsed,
+            "total_p50": percentile(total, 50),
+            "total_p99": percentile(total, 99),
+            "rest_calls": rest.total,
+            "peak_mb": peak,
+        }))
+    return results.failed == 0 and rest.empty_files == 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500, help="Virtual users (one ticket each)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which users arrive (0 = all at once)")
+    parser.add_argument("--latency", type=float, default=20.0, help="Fake REST latency in ms")
+    parser.add_argument("--rate-limits", action="store_true", help="Apply Discord-like rate limits")
+    parser.add_argument("--raise-429", action="store_true", help="Rate-limited calls raise HTTP 429 instead of waiting")
+    parser.add_argument("--guilds", type=int, default=1, help="Servers the users are spread over (one bot serves them all)")
+    parser.add_argument("--modal", action="store_true", help="Use the pop-up form intake for every ticket type")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="Spare ticket channels per server")
+    parser.add_argument("--max-open", type=int, default=MAX_OPEN_TICKETS, help="Most tickets open at once per server, the rest wait in line (0 = no limit)")
+    parser.add_argument("--create-rate", type=float, default=CREATE_RATE, help="New ticket channels per second per server (0 = no limit)")
+    parser.add_argument("--create-burst", type=int, default=CREATE_BURST, help="Channels that may be created at once before --create-rate applies")
+    parser.add_argument("--typo-rate", type=float, default=0.2, help="Share of users who first type an invalid Player ID")
+    parser.add_argument("--revise-rate", type=float, default=0.2, help="Share of users who revise one field")
+    parser.add_argument("--attachment-rate", type=float, default=0.5, help="Share of users who upload files")
+    parser.add_argument("--roster", action="store_true", help="Check Player IDs and names against a roster of all virtual users")
+    parser.add_argument("--shared-evidence-rate", type=float, default=0.0, help="Share of users who attach one of a few well-known screenshots")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Share of users who report one of a few well-known issues")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds a virtual user waits for the bot before giving up")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--worker", default="0/1", help="This process' number out of all processes, e.g. 1/4 (used by bench/shards.py)")
+    parser.add_argument("--id-base", type=int, default=0, help="First fake Discord id (shared by all processes of one run)")
+    parser.add_argument("--json", action="store_true", help="Also print the summary as one JSON line")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        ok = asyncio.run(main(parse_args()))
+    finally:
+        shutil.rmtree(_state_dir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
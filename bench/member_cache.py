@@ -0,0 +1,174 @@
+"""
+Member cache benchmark: startup time and RSS of each member cache mode.
+
+Runs completely offline. It feeds a fake server with N members (what member
+chunking downloads) and M chat messages through discord.py's own cache code
+and compares:
+
+- chunk at startup: discord.py's defaults, which the bot used before
+  (chunk_guilds_at_startup=True, every member cached). "Ready" waits until
+  all members are downloaded.
+- full cache: what PersistentBot does now without LOW_MEMORY_MODE. Ready
+  comes right away and the members are downloaded in the background
+  afterwards (PersistentBot.chunk_members).
+- low-memory: LOW_MEMORY_MODE. No members are downloaded or kept, and
+  there is no message cache.
+
+Every mode runs in its own process, so the RSS numbers don't mix. Members
+arrive in chunks of 1000 like on the gateway; --chunk-ms adds a delay per
+chunk to stand in for the network (0 by default).
+
+Usage:
+    python bench/member_cache.py --members 20000 --messages 2000
+    python bench/member_cache.py --members 100000 --chunk-ms 50
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import discord
+from discord.member import Member
+from discord.state import ConnectionState
+
+# The options of each mode (see LOW_MEMORY_MODE in bot.py), and when the members are downloaded
+MODES = {
+    "chunk at startup": ({
+        "chunk_guilds_at_startup": True,
+        "member_cache_flags": discord.MemberCacheFlags.all(),
+    }, "before ready"),
+    "full cache": ({"chunk_guilds_at_startup": False}, "after ready"),
+    "low-memory": ({
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "max_messages": None,
+    }, None),
+}
+
+# Members per gateway chunk
+CHUNK_SIZE = 1000
+
+
+def fake_member(i):
+    return {
+        "user": {"id": str(10**17 + i), "username": f"survivor{i}", "discriminator": "0", "avatar": None, "global_name": None},
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def fake_message(i):
+    member = fake_member(i)
+    return {
+        "id": str(10**18 + i),
+        "channel_id": "5",
+        "guild_id": "1",
+        "author": member.pop("user"),
+        "member": member,
+        "content": "Is the furnace still burning? " * 3,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def fake_guild(members):
+    return {
+        "id": "1",
+        "name": "Whiteout Alliance",
+        "owner_id": "2",
+        "member_count": members,
+        "members": [],
+        "roles": [{"id": "1", "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": "5", "type": 0, "name": "general", "position": 0, "permission_overwrites": []}],
+    }
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def chunk(guild, state, members, chunk_ms):
+    """Member chunking: every member is downloaded (CHUNK_SIZE at a time) and cached."""
+    for start in range(0, members, CHUNK_SIZE):
+        if chunk_ms:
+            time.sleep(chunk_ms / 1000)
+        for i in range(start, min(members, start + CHUNK_SIZE)):
+            member = Member(data=fake_member(i), guild=guild, state=state)
+            if state.member_cache_flags.joined:
+                guild._add_member(member)
+
+
+def run_mode(name, members, messages, chunk_ms):
+    """Simulates one cold start in this process. Returns the numbers."""
+    options, when = MODES[name]
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    rss_before = peak_rss_mb()
+
+    started = time.perf_counter()
+    state = ConnectionState(dispatch=lambda *args, **kwargs: None, handlers={}, hooks={}, http=None, intents=intents, **options)
+    state.user = None
+    guild = discord.Guild(data=fake_guild(members), state=state)
+    state._add_guild(guild)
+    if when == "before ready":
+        chunk(guild, state, members, chunk_ms)
+    ready = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if when == "after ready":
+        chunk(guild, state, members, chunk_ms)
+    background = time.perf_counter() - started
+
+    # Normal chat traffic afterwards
+    for i in range(messages):
+        state.parse_message_create(fake_message(i))
+
+    return {
+        "ready": ready,
+        "background": background,
+        "rss": peak_rss_mb() - rss_before,
+        "members": len(guild.members),
+        "messages": len(state._messages or ()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--chunk-ms", type=float, default=0, help="Delay per chunk of 1000 members (network)")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)  # Runs one mode (used internally)
+    args = parser.parse_args()
+
+    if args.mode:
+        print("RESULT " + json.dumps(run_mode(args.mode, args.members, args.messages, args.chunk_ms)))
+        return
+
+    print(f"{'mode':<17} {'ready':>8} {'background':>11} {'RSS':>10} {'members':>9} {'messages':>9}")
+    for name in MODES:
+        command = [sys.executable, os.path.abspath(__file__), "--mode", name,
+                   "--members", str(args.members), "--messages", str(args.messages), "--chunk-ms", str(args.chunk_ms)]
+        output = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True).stdout
+        line = next(l for l in output.splitlines() if l.startswith("RESULT "))
+        result = json.loads(line[len("RESULT "):])
+        print(f"{name:<17} {result['ready']:>7.2f}s {result['background']:>10.2f}s {result['rss']:>7.1f} MB "
+              f"{result['members']:>9} {result['messages']:>9}")
+
+
+if __name__ == "__main__":
+    main()
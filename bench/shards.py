@@ -0,0 +1,102 @@
+"""
+Shard scaling benchmark: how ticket throughput grows with more bot processes.
+
+For every shard count N it starts N copies of bench/loadtest.py at the same
+time, one per shard (SHARD_COUNT=N, SHARD_IDS=i), exactly like a
+multi-process deployment. The users and servers are split between them, and
+all processes share one cooldowns.db and one interviews.db, so the cost of
+the shared SQLite state is included in the numbers.
+
+Throughput only scales while there are free CPU cores: on a 1-core machine
+more processes just take turns.
+
+Usage:
+    python bench/shards.py --users 2000 --shards 1,2,4
+    python bench/shards.py --users 1000 --shards 1,2 -- --rate-limits --modal
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import discord
+
+LOADTEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadtest.py")
+
+
+def run(shard_count, args, extra):
+    """Runs one load test split over `shard_count` processes. Returns the per-process results."""
+    state_dir = tempfile.mkdtemp(prefix=f"whitey-shards{shard_count}-")
+    id_base = discord.utils.time_snowflake(datetime.datetime.now(datetime.timezone.utc))
+
+    processes = []
+    for shard_id in range(shard_count):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=str(shard_id),
+            COOLDOWN_DB=os.path.join(state_dir, "cooldowns.db"),
+            CHECKPOINT_DB=os.path.join(state_dir, "interviews.db"),
+            ARCHIVE_DB=os.path.join(state_dir, "reports.db"),
+        )
+        users = args.users // shard_count + (shard_id < args.users % shard_count)
+        command = [
+            sys.executable, LOADTEST,
+            "--users", str(users),
+            "--guilds", str(max(1, args.guilds // shard_count)),
+            "--worker", f"{shard_id}/{shard_count}",
+            "--id-base", str(id_base),
+            "--seed", str(shard_id + 1),
+            "--json",
+        ] + extra
+        processes.append(subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True))
+
+    results = []
+    try:
+        for process in processes:
+            output, _ = process.communicate()
+            line = next((l for l in output.splitlines() if l.startswith("RESULT ")), None)
+            if line is None:
+                raise RuntimeError(f"A load test process failed (exit code {process.returncode}):\n{output}")
+            results.append(json.loads(line[len("RESULT "):]))
+    finally:
+        for process in processes:
+            process.wait()
+        shutil.rmtree(state_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Virtual users in total (split between the processes)")
+    parser.add_argument("--guilds", type=int, default=8, help="Servers in total (split between the processes)")
+    parser.add_argument("--shards", default="1,2,4", help="Shard counts to compare")
+    parser.add_argument("extra", nargs="*", help="More options for loadtest.py (after --)")
+    args = parser.parse_args()
+
+    print(f"❄️ Shard scaling: {args.users} users, {args.guilds} servers, {os.cpu_count()} CPU cores")
+    print(f"\n{'shards':>6} {'completed':>10} {'failed':>7} {'wall s':>8} {'tickets/s':>10} {'speedup':>8} {'p50 s':>7} {'p99 s':>7} {'MB/proc':>8}")
+    baseline = None
+    for shard_count in (int(n) for n in args.shards.split(",")):
+        started = time.perf_counter()
+        results = run(shard_count, args, args.extra)
+        wall = time.perf_counter() - started
+
+        completed = sum(r["completed"] for r in results)
+        failed = sum(r["failed"] for r in results)
+        elapsed = max(r["elapsed"] for r in results)  # Without process start-up
+        throughput = completed / elapsed
+        baseline = baseline or throughput
+        p50 = max(r["total_p50"] for r in results)
+        p99 = max(r["total_p99"] for r in results)
+        memory = max(r["peak_mb"] for r in results)
+        print(f"{shard_count:>6} {completed:>10} {failed:>7} {wall:>8.1f} {throughput:>10.1f} {throughput / baseline:>7.2f}x {p50:>7.2f} {p99:>7.2f} {memory:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
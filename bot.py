@@ -1,14 +1,34 @@
-from keep_alive import keep_alive  # Imports the Flask server to keep the bot running 24/7
-import discord
-from discord.ext import commands
+import time
+IMPORT_STARTED = time.perf_counter()  # Start of the startup report (see main())
+
 import asyncio
 import datetime
-import time
+import math
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from the .env file (used for local testing)
-load_dotenv()
+# Load environment variables from the .env file (used for local testing).
+# Only when started as a program: importing this file (load test, tools) has no side effects.
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import discord
+from discord.ext import commands
+from dispatcher import InterviewDispatcher
+from cooldowns import CooldownStore
+from relay import EvidenceRelay, is_image
+from evidence import EvidenceCache
+from scheduler import SendScheduler, PRIORITY_LOG
+from pool import TicketChannelPool
+from checkpoints import InterviewCheckpoints
+from reaper import TicketReaper
+from admission import AdmissionController, QueueFull
+from guild_config import GuildConfigStore
+from sharding import SHARDS
+from archive import ReportArchive, SEARCH_PAGE_SIZE, parse_search
+from dedup import DuplicateDetector
+from roster import Roster
+from metrics import TICKET_CREATION_SECONDS, StartupTimer, stage, record_stage
 
 # ==========================================
 # ⚙️ SECTION 1: CONFIGURATION
@@ -16,16 +36,13 @@ load_dotenv()
 """
 This section holds all the sensitive data and settings.
 Edit these numbers to match your specific Discord server.
+To run the bot in several servers, put per-server settings in guilds.json
+(see guild_config.py); the values below are used for any server not listed there.
 """
 
 # Securely get the token. If on Cloud, it gets it from Environment Variables.
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-# Safety check: Stops the bot immediately if no token is found.
-if TOKEN is None:
-    print("❌ Error: DISCORD_TOKEN not found! Check your .env file or Cloud Settings.")
-    exit()
-
 # Channel IDs where the final reports will be sent
 LOG_CHANNELS = {
     "Bug": 1436611647463489568,        
@@ -40,9 +57,29 @@ ROLE_PINGS = {
     "Complaint": 1436783614384800008        
 }
 
+# Low-memory mode (recommended for Render's free tier): members are NOT downloaded
+# and cached at startup, and messages are not cached. Members are fetched only when needed.
+LOW_MEMORY_MODE = os.getenv('LOW_MEMORY_MODE', 'false').lower() in ('1', 'true', 'yes')
+
 # The Role ID for "Verified" members (Used for cooldown logic)
 VERIFIED_ROLE_ID = 1436577314589769782  
 
+# Cooldown (seconds) between tickets, by rank
+COOLDOWNS = {
+    "owner": 60,      # 1 Minute for Owner
+    "admin": 120,     # 2 Minutes for Admins
+    "verified": 300,  # 5 Minutes for Verified Members
+    "member": 600     # 10 Minutes for everyone else
+}
+
+# Ticket types that collect their text answers with a pop-up form (Discord Modal)
+# instead of one chat message per question. Set to True to enable.
+MODAL_INTAKE = {
+    "Bug": False,
+    "Suggestion": False,
+    "Complaint": False
+}
+
 # ==========================================
 # 📝 SECTION 2: TEXT & DATA
 # ==========================================
@@ -50,9 +87,6 @@ VERIFIED_ROLE_ID = 1436577314589769782
 """We store long text and questions here to keep the logic code clean."""
 
 
-# Dictionary to track how long users have to wait (User ID: Time)
-user_cooldowns = {}
-
 # The short messages sent when a user clicks a button (Only they can see this)
 EPHEMERAL_MESSAGES = {
     "Bug": "🔧 **Engineering Bay Opened!**\nHi {user}, I have established a secure line here: {channel}.\nLet's fix those broken gears!",
@@ -134,32 +168,277 @@ QUESTIONS = {
     }
 }
 
+# Fields that expect an uploaded file. These are always asked in the chat,
+# because pop-up forms cannot receive attachments.
+ATTACHMENT_FIELDS = ("Attachment", "Evidence")
+
+# Fields that get a big multi-line text box in the pop-up form
+PARAGRAPH_FIELDS = ("Description", "Idea", "Benefit", "Violation")
+
+# Fields compared by the duplicate detector (reports saying the same thing are grouped)
+DEDUP_FIELDS = ("Description", "Idea", "Violation")
+
+# Discord allows at most 5 text boxes per pop-up form
+MODAL_MAX_FIELDS = 5
+
+# Time allowed per text box while a pop-up form is open (seconds), the same as for a chat answer
+MODAL_SECONDS_PER_FIELD = 300
+
+# Everything above, in the format of guilds.json (the built-in settings)
+DEFAULT_SETTINGS = {
+    "log_channels": LOG_CHANNELS,
+    "role_pings": ROLE_PINGS,
+    "verified_role_id": VERIFIED_ROLE_ID,
+    "cooldowns": COOLDOWNS,
+    "modal_intake": MODAL_INTAKE,
+    "ephemeral_messages": EPHEMERAL_MESSAGES,
+    "intro_embeds": INTRO_EMBEDS,
+    "questions": QUESTIONS
+}
+
+def attachment_label(attachments):
+    """The text shown in the summary instead of the uploaded files."""
+    if len(attachments) == 1:
+        return "*(Image Attached)*"
+    return f"*({len(attachments)} Files Attached)*"
+
+def validate_answer(field, value, repeated=False):
+    """
+    Checks a single answer. Returns an error message, or None if it is valid.
+    Used by both the chat questions and the pop-up form.
+    Answers missing from the alliance roster are refused once with a
+    suggestion; `repeated` (the same answer sent again) keeps them anyway.
+    """
+    if field == "Player ID" and not value.isdigit():
+        return "⚠️ **Invalid Player ID.** Numbers only please."
+    hint = bot.roster.check(field, value)
+    if hint and not repeated:
+        return hint + "\nSend the same answer again to keep it."
+    return None
+
 # ==========================================
 # 🤖 SECTION 3: MAIN BOT CLASS
 # ==========================================
 
-class PersistentBot(commands.Bot):
+def rss_mb():
+    """Current memory (RSS) used by the bot, in MB. Returns 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+async def get_or_fetch_member(guild, user_id):
+    """Looks up a member in the cache, or asks Discord if it isn't cached (low-memory mode)."""
+    member = guild.get_member(user_id)
+    if member is None:
+        member = await guild.fetch_member(user_id)
+    return member
+
+# With SHARD_COUNT set, the servers are split between several gateway connections
+BotBase = commands.AutoShardedBot if SHARDS.enabled else commands.Bot
+
+class PersistentBot(BotBase):
     """
     Custom Bot Class that allows buttons to survive restarts (Persistence).
     """
     def __init__(self):
+        # Startup report: import, setup, login, ready and first interaction
+        self.startup = StartupTimer(IMPORT_STARTED)
+        self.startup.mark("import")
+
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
-        super().__init__(command_prefix="!", intents=intents)
+
+        # Members are never downloaded before "ready" (that can take many seconds in big
+        # servers). With the full cache they are downloaded in the background afterwards.
+        cache_options = {"chunk_guilds_at_startup": False}
+        if LOW_MEMORY_MODE:
+            cache_options.update({
+                "member_cache_flags": discord.MemberCacheFlags.none(),  # Don't keep members in memory
+                "max_messages": None  # Don't keep old messages in memory
+            })
+        shard_options = SHARDS.bot_options() if SHARDS.enabled else {}
+        super().__init__(command_prefix="!", intents=intents, **cache_options, **shard_options)
+
+        # One message router shared by every open interview
+        self.interviews = InterviewDispatcher()
+
+        # Tracks how long users have to wait (saved to disk, survives restarts)
+        # With several bot processes the database is shared and always checked directly
+        self.cooldowns = CooldownStore(shared=SHARDS.multi_process)
+
+        # Streams evidence files into the log channels. Files seen before come from
+        # the local cache, and files already in the log channel are linked, not re-uploaded.
+        self.evidence = EvidenceCache()
+        self.relay = EvidenceRelay(cache=self.evidence)
+
+        # Queues every message/channel call so bursts don't pile up rate limits
+        self.outbound = SendScheduler()
+
+        # Spare ticket channels, ready to hand out instantly
+        self.pool = TicketChannelPool(self.outbound)
+
+        # Saves answers as they come in, so interviews survive a restart
+        self.checkpoints = InterviewCheckpoints()
+
+        # Searchable copy of every submitted report (for !search)
+        self.archive = ReportArchive()
+
+        # Groups near-identical reports under the first one (index rebuilt from the archive after startup)
+        self.duplicates = DuplicateDetector()
+
+        # Cleans up ticket channels that were left behind
+        self.reaper = TicketReaper(self)
+
+        # Caps open tickets and queues the overflow when everyone clicks at once
+        self.admission = AdmissionController()
+
+        # Per-server settings from guilds.json (reloaded when the file changes)
+        self.guild_config = GuildConfigStore(DEFAULT_SETTINGS)
+
+        # Log channels that live in a server run by another process
+        self.remote_channels = {}
+
+        # The task running each interview, so it can be stopped when its channel is deleted
+        self.interview_tasks = {}  # channel_id: asyncio.Task
+
+        # Alliance member export, used to catch typos in Player IDs and names (optional, loaded after startup)
+        self.roster = Roster()
 
     async def setup_hook(self):
-        """This function runs once when the bot starts. It re-loads the buttons."""
+        """This function runs once when the bot starts (right after login). It re-loads the buttons."""
+        self.startup.mark("login")
         self.add_view(TicketLauncher())
+        self.add_view(TicketControls())
+        self.add_view(ConfirmView(persistent=True))
+        self.add_listener(self.interviews.feed, 'on_message')
         print("✅ Persistent Views Loaded")
 
+        # Continue the interviews that were running before the restart
+        asyncio.create_task(self.resume_interviews())
+
+        # Pick up changes to guilds.json and the roster export without a restart
+        asyncio.create_task(self.guild_config.watch())
+        asyncio.create_task(self.roster.watch(load_now=True))
+
+        # Rebuild the duplicate index once connected (not needed to answer the first buttons)
+        asyncio.create_task(self.load_duplicates())
+
+        # Sweep stale ticket channels now and every few minutes
+        asyncio.create_task(self.reaper.run())
+
+    async def load_duplicates(self):
+        """Rebuilds the duplicate index from the archive in small steps, without blocking the bot."""
+        await self.wait_until_ready()
+        started = time.perf_counter()
+        rows = self.archive.recent_signatures(time.time() - self.duplicates.window)
+        while True:
+            batch = rows.fetchmany(1000)
+            if not batch:
+                break
+            self.duplicates.load(batch)
+            await asyncio.sleep(0)  # Let button clicks through between batches
+        print(f"🔁 Duplicate index: {len(self.duplicates)} recent reports in {time.perf_counter() - started:.2f}s")
+
+    async def chunk_members(self):
+        """Downloads the members of every server in the background (full-cache mode)."""
+        started = time.perf_counter()
+        for guild in self.guilds:
+            if not guild.chunked:
+                await guild.chunk()
+        members = sum(len(g.members) for g in self.guilds)
+        print(f"👥 {members} members cached in {time.perf_counter() - started:.2f}s")
+
+    def first_response(self):
+        """Called after answering a button; prints the startup report the first time."""
+        if self.startup.mark("first_interaction"):
+            print(f"⏱️ Startup: {self.startup.report()}")
+
+    async def resume_interviews(self):
+        """
+        Reloads saved interviews and continues them at the next unanswered question.
+        Interviews whose channel or user is gone are forgotten.
+        """
+        await self.wait_until_ready()
+        started = time.perf_counter()
+        resumed = 0
+
+        # Only our own servers: the other processes resume theirs
+        for saved in self.checkpoints.load_all(owns=SHARDS.owns):
+            channel = self.get_channel(saved["channel_id"])
+            if channel is None:
+                self.checkpoints.finish(saved["channel_id"])
+                continue
+
+            try:
+                member = await get_or_fetch_member(channel.guild, saved["user_id"])
+            except discord.HTTPException:
+                self.checkpoints.finish(saved["channel_id"])
+                continue
+
+            # Resumed tickets were already admitted before the restart: they skip the line
+            slot = self.admission.claim(channel.guild.id, saved["ticket_type"])
+            task = asyncio.create_task(run_interview(channel, member, saved["ticket_type"], resume=saved))
+            task.add_done_callback(lambda _, slot=slot: slot.release())
+            resumed += 1
+
+        if resumed:
+            print(f"♻️ Resumed {resumed} interviews in {time.perf_counter() - started:.2f}s")
+
+    async def get_or_fetch_channel(self, channel_id):
+        """
+        Looks up a channel in the cache, or asks Discord if it isn't there.
+        With several processes the log channels may be in a server run by
+        another process, so they are never in our cache. Returns None if missing.
+        """
+        channel = self.get_channel(channel_id) or self.remote_channels.get(channel_id)
+        if channel is None:
+            try:
+                channel = self.remote_channels[channel_id] = await self.fetch_channel(channel_id)
+            except discord.HTTPException:
+                return None
+        return channel
+
+    async def close(self):
+        """Runs when the bot shuts down. Closes open files and connections."""
+        await self.relay.close()
+        if getattr(self, "web_runner", None):
+            await self.web_runner.cleanup()
+        await super().close()
+
+    async def on_guild_channel_delete(self, channel):
+        """
+        A ticket channel was deleted (e.g. "End Conversation" or by hand):
+        stops its interview, so its admission slot and message queue are freed.
+        """
+        task = self.interview_tasks.pop(channel.id, None)
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            self.checkpoints.finish(channel.id)
+            task.cancel()
+
     async def on_ready(self):
         """Runs when the bot successfully connects to Discord."""
         print(f'Logged in as {self.user}')
+
+        # Startup report (compare it with LOW_MEMORY_MODE on and off)
+        if self.startup.mark("ready"):
+            mode = "low-memory" if LOW_MEMORY_MODE else "full cache"
+            print(f"📊 Ready in {self.startup.marks['ready']:.2f}s | RSS {rss_mb():.1f} MB | mode: {mode} | {SHARDS.describe()}")
+            print(f"⏱️ Startup: {self.startup.report()}")
+            if not LOW_MEMORY_MODE:
+                asyncio.create_task(self.chunk_members())
+
+        # Prepare spare ticket channels (only where tickets were used before)
+        for guild in self.guilds:
+            self.pool.warm(guild)
         # Sets the "Watching the Furnace" status
         await self.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name="the Furnace 🔥"))
 
-bot = PersistentBot()
+# Created by create_bot() (see main()), so importing this file has no side effects
+bot = None
 
 # ==========================================
 # 🖥️ SECTION 4: UI VIEWS (BUTTONS)
@@ -177,37 +456,50 @@ class TicketLauncher(discord.ui.View):
         """
         Central logic to check cooldowns and create tickets.
         """
+        started = time.perf_counter()
         user = interaction.user
         user_id = user.id
+        config = bot.guild_config.get(interaction.guild.id)
         
         # --- TIERED COOLDOWN LOGIC ---
-        if user.id == interaction.guild.owner_id:
-            limit = 60  # 1 Minute for Owner
-        elif user.guild_permissions.administrator:
-            limit = 120 # 2 Minutes for Admins
-        elif discord.utils.get(user.roles, id=VERIFIED_ROLE_ID):
-            limit = 300 # 5 Minutes for Verified Members
-        else:
-            limit = 600 # 10 Minutes for everyone else
-
-        # Check if user is on cooldown
-        if user_id in user_cooldowns:
-            last_time = user_cooldowns[user_id]
-            if time.time() - last_time < limit:
-                remaining = int(limit - (time.time() - last_time))
-                minutes = remaining // 60
-                seconds = remaining % 60
-                await interaction.response.send_message(f"❄️ **Chill out, Chief!**\nBased on your rank, you must wait **{minutes}m {seconds}s**.", ephemeral=True)
-                return
+        # Owner, Admins, Verified Members and everyone else (see COOLDOWNS)
+        limit = config.cooldown_for(user)
 
-        # Save current time as last used time
-        user_cooldowns[user_id] = time.time()
+        # Check the cooldown and start a new one in one step,
+        # so two clicks at the same instant can't both get through
+        remaining = bot.cooldowns.check_and_set(user_id, limit)
+        if remaining:
+            remaining = int(remaining)
+            minutes = remaining // 60
+            seconds = remaining % 60
+            await interaction.response.send_message(f"❄️ **Chill out, Chief!**\nBased on your rank, you must wait **{minutes}m {seconds}s**.", ephemeral=True)
+            bot.first_response()
+            return
         
         # IMPORTANT: Defer the response. This tells Discord "Wait, I'm working" 
         # to prevent the "Unknown Interaction" error on slow cloud servers.
-        await interaction.response.defer(ephemeral=True)
-        
-        await create_ticket(interaction, ticket_type)
+        with stage("defer", ticket_type):
+            await interaction.response.defer(ephemeral=True)
+        bot.first_response()
+
+        # --- ADMISSION CONTROL ---
+        # If too many tickets are open, wait in line (first come, first served)
+        async def on_queued(position, eta):
+            eta = int(eta)
+            await interaction.followup.send(f"⏳ **The Furnace is packed, Chief!**\nYou are **#{position}** in line. Estimated wait: **~{eta // 60}m {eta % 60}s**.\nYour ticket will open automatically.", ephemeral=True)
+
+        try:
+            with stage("admission", ticket_type, log_slow=False):
+                slot = await bot.admission.admit(interaction.guild.id, ticket_type, on_queued)
+        except QueueFull:
+            bot.cooldowns.clear(user_id)
+            await interaction.followup.send("❄️ **Too many survivors at the Furnace right now.**\nPlease try again in a few minutes.", ephemeral=True)
+            return
+
+        try:
+            await create_ticket(interaction, ticket_type, started, config)
+        finally:
+            slot.release()
 
     # Define the 3 Buttons
     @discord.ui.button(label="Report Bug", style=discord.ButtonStyle.red, custom_id="btn_bug", emoji="🐛")
@@ -229,8 +521,9 @@ class TicketControls(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
-    @discord.ui.button(label="End Conversation", style=discord.ButtonStyle.grey, emoji="❌")
+    @discord.ui.button(label="End Conversation", style=discord.ButtonStyle.grey, emoji="❌", custom_id="ticket_close")
     async def close(self, interaction: discord.Interaction, button: discord.ui.Button):
+        bot.checkpoints.finish(interaction.channel.id)
         await interaction.response.send_message("❄️ Closing ticket as requested...")
         await asyncio.sleep(2)
         await interaction.channel.delete()
@@ -238,37 +531,187 @@ class TicketControls(discord.ui.View):
 class ConfirmView(discord.ui.View):
     """
     The Yes/No buttons shown after the user answers all questions.
+    The copy registered at startup (persistent=True) only answers clicks on
+    summaries that were sent before a restart.
     """
-    def __init__(self):
-        super().__init__(timeout=None)
+    def __init__(self, persistent=False, timeout=None):
+        super().__init__(timeout=timeout)
+        self.persistent = persistent
         self.value = None
 
-    @discord.ui.button(label="Yes, Submit", style=discord.ButtonStyle.green)
+    async def interaction_check(self, interaction: discord.Interaction):
+        if self.persistent:
+            await interaction.response.send_message("♻️ This summary is from before a restart. Please use the newest one below.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Yes, Submit", style=discord.ButtonStyle.green, custom_id="ticket_confirm")
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
         self.value = True # User clicked Yes
         self.stop()
         await interaction.response.defer()
 
-    @discord.ui.button(label="No, Revise", style=discord.ButtonStyle.red)
+    @discord.ui.button(label="No, Revise", style=discord.ButtonStyle.red, custom_id="ticket_revise")
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
         self.value = False # User clicked No
         self.stop()
         await interaction.response.defer()
 
+class IntakeModal(discord.ui.Modal):
+    """
+    A pop-up form with one text box per question (up to 5 per page).
+    Built straight from the server's questions.
+    """
+    def __init__(self, intake_view, page):
+        fields = intake_view.pages[page]
+        title = f"{intake_view.ticket_type} Report"
+        if len(intake_view.pages) > 1:
+            title += f" ({page + 1}/{len(intake_view.pages)})"
+        super().__init__(title=title, timeout=None)
+
+        self.intake_view = intake_view
+        self.page = page
+        self.inputs = {}
+
+        for field in fields:
+            question = intake_view.questions[field].replace("**", "")
+            style = discord.TextStyle.paragraph if field in PARAGRAPH_FIELDS else discord.TextStyle.short
+            text_box = discord.ui.TextInput(
+                label=field[:45],
+                placeholder=question[:100],
+                style=style,
+                default=intake_view.answers.get(field),
+                max_length=1024  # Longest value an embed field can show
+            )
+            self.add_item(text_box)
+            self.inputs[field] = text_box
+
+    async def on_submit(self, interaction: discord.Interaction):
+        values = {field: box.value.strip() for field, box in self.inputs.items()}
+
+        # Keep what they typed so the form is pre-filled if they need to fix something
+        self.intake_view.answers.update(values)
+
+        # Validate the whole page at once (an answer refused before and sent again is kept)
+        errors = {f: validate_answer(f, v, repeated=self.intake_view.refused.get(f) == v) for f, v in values.items()}
+        errors = {f: error for f, error in errors.items() if error}
+        self.intake_view.refused.update((f, values[f]) for f in errors)
+        if errors:
+            self.intake_view.timeout = self.intake_view.idle_timeout
+            await interaction.response.send_message("\n".join(errors.values()) + "\nClick **Fill in Form** to fix it.", ephemeral=True)
+            return
+
+        self.intake_view.page = self.page + 1
+        self.intake_view.timeout = self.intake_view.idle_timeout  # Back to the normal wait for the next click
+        if self.intake_view.page < len(self.intake_view.pages):
+            await interaction.response.send_message(f"✅ Page {self.page + 1} saved! Click **Fill in Form** for the next page.", ephemeral=True)
+            return
+
+        # All pages are done
+        self.intake_view.value = True
+        self.intake_view.stop()
+        await interaction.response.defer()
+
+class IntakeView(discord.ui.View):
+    """
+    The 'Fill in Form' button that opens the pop-up form inside the ticket.
+    `timeout` is the wait for a click. While a form is open the wait is
+    longer (MODAL_SECONDS_PER_FIELD per text box), because typing in the
+    form doesn't count as activity for the button.
+    """
+    def __init__(self, user, ticket_type, questions, timeout=300):
+        super().__init__(timeout=timeout)
+        self.idle_timeout = timeout
+        self.user = user
+        self.ticket_type = ticket_type
+        self.questions = questions
+        self.answers = {}
+        self.refused = {}  # field: last answer that failed validation
+        self.value = None
+
+        # Split the text questions into pages of 5
+        text_fields = [f for f in self.questions if f not in ATTACHMENT_FIELDS]
+        self.pages = [text_fields[i:i + MODAL_MAX_FIELDS] for i in range(0, len(text_fields), MODAL_MAX_FIELDS)]
+        self.page = 0
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        # Only the ticket owner can fill in the form
+        return interaction.user.id == self.user.id
+
+    @discord.ui.button(label="Fill in Form", style=discord.ButtonStyle.blurple, emoji="📝")
+    async def open_form(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.timeout = len(self.pages[self.page]) * MODAL_SECONDS_PER_FIELD  # Restarts the countdown
+        await interaction.response.send_modal(IntakeModal(self, self.page))
+
+class SearchResults(discord.ui.View):
+    """
+    One page of !search results with ◀ ▶ buttons.
+    Only the moderator who searched can turn the pages.
+    """
+    def __init__(self, author, guild_id, filters, words, timeout=180):
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.guild_id = guild_id
+        self.filters = filters
+        self.words = words
+        self.page = 1
+        self.pages = 1
+
+    def render(self):
+        """Runs the search for the current page and returns the embed."""
+        started = time.perf_counter()
+        total, reports = bot.archive.search(
+            self.guild_id, self.words,
+            ticket_type=self.filters.get("type"),
+            player_id=self.filters.get("player"),
+            name=self.filters.get("name"),
+            page=self.page
+        )
+        took = (time.perf_counter() - started) * 1000
+        self.pages = max(1, math.ceil(total / SEARCH_PAGE_SIZE))
+        self.previous_page.disabled = self.page <= 1
+        self.next_page.disabled = self.page >= self.pages
+
+        embed = discord.Embed(title=f"🔎 {total} report(s) found", color=discord.Color.blue())
+        for report in reports:
+            who = report["in_game_name"] or report["user_name"]
+            if report["player_id"]:
+                who += f" ({report['player_id']})"
+            submitted = datetime.datetime.fromtimestamp(report["submitted_at"], datetime.timezone.utc)
+            value = f"{report['snippet'] or ''}\n{discord.utils.format_dt(submitted, 'f')}"
+            if report["log_message_id"]:
+                value += f" • [Open log](https://discord.com/channels/{report['log_guild_id']}/{report['log_channel_id']}/{report['log_message_id']})"
+            embed.add_field(name=f"#{report['id']} • {report['ticket_type']} • {who}"[:256], value=value.strip()[:1024], inline=False)
+        if not reports:
+            embed.description = "No reports match. Try fewer words, or a `*` at the end of a word (e.g. `crash*`)."
+        embed.set_footer(text=f"Page {self.page}/{self.pages} • {took:.1f} ms")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.author.id
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.gray)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(1, self.page - 1)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.gray)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.pages, self.page + 1)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
 # ==========================================
 # 🧠 SECTION 5: TICKET LOGIC
 # ==========================================
 
-async def create_ticket(interaction, ticket_type):
+async def create_ticket(interaction, ticket_type, started=None, config=None):
     """
     Creates a private channel for the user.
+    `started` is when the button was clicked (for the creation latency metric).
+    `config` is the server's settings (looked up if not given).
     """
     guild = interaction.guild
-    
-    # Find or Create the "Tickets" category
-    category = discord.utils.get(guild.categories, name="Tickets")
-    if not category:
-        category = await guild.create_category("Tickets")
+    config = config or bot.guild_config.get(guild.id)
 
     # Set permissions: Only the Bot and the User can see this channel
     overwrites = {
@@ -277,75 +720,178 @@ async def create_ticket(interaction, ticket_type):
         guild.me: discord.PermissionOverwrite(read_messages=True)
     }
     
-    # Create the channel
+    # Take a ready-made channel from the pool (or create one if the pool is empty)
     channel_name = f"{ticket_type.lower()}-{interaction.user.name}"
-    ticket_channel = await guild.create_text_channel(channel_name, category=category, overwrites=overwrites)
-    
-    # Create the ephemeral "Click here" message
-    msg_template = EPHEMERAL_MESSAGES[ticket_type]
-    formatted_msg = msg_template.format(user=interaction.user.mention, channel=ticket_channel.mention)
-    
-    # Use followup.send because we deferred earlier
-    await interaction.followup.send(formatted_msg, ephemeral=True)
+    with stage("channel", ticket_type):
+        ticket_channel = await bot.pool.claim(guild, channel_name, overwrites)
     
-    # Start the Q&A process (Wrap in try/except in case user deletes channel)
     try:
-        await run_interview(ticket_channel, interaction.user, ticket_type)
-    except:
-        pass
+        # Create the ephemeral "Click here" message
+        msg_template = config.ephemeral_messages[ticket_type]
+        formatted_msg = msg_template.format(user=interaction.user.mention, channel=ticket_channel.mention)
+        
+        # Use followup.send because we deferred earlier
+        with stage("followup", ticket_type):
+            await interaction.followup.send(formatted_msg, ephemeral=True)
+        if started is not None:
+            TICKET_CREATION_SECONDS.observe(time.perf_counter() - started, ticket_type=ticket_type)
+        
+        # Start the Q&A process (Wrap in try/except in case user deletes channel)
+        # If anything goes wrong the channel is left behind; the reaper cleans it up.
+        try:
+            await run_interview(ticket_channel, interaction.user, ticket_type, config=config)
+        except Exception as e:
+            print(f"⚠️ Interview in #{ticket_channel.name} stopped: {e}")
+    finally:
+        bot.pool.done(ticket_channel)  # From now on the reaper judges it like any other ticket
+
+async def post_duplicate(log_channel, match, ticket_type, ping, log_embed, files):
+    """
+    Posts a likely duplicate in a thread under the original report's log
+    message (no new ping), and updates the counter on the original.
+    `match` is (original report id, similarity) from the duplicate detector.
+    Returns the posted message, or None if it has to be posted normally.
+    """
+    original_id, similarity = match
+    async with bot.duplicates.thread_lock(original_id):
+        original = bot.archive.original(original_id)
+        if original is None or original["log_channel_id"] != log_channel.id or not original["log_message_id"]:
+            return None  # The log channel changed (or the original was never logged)
+
+        message = log_channel.get_partial_message(original["log_message_id"])
+        try:
+            thread = await bot.get_or_fetch_channel(original["thread_id"]) if original["thread_id"] else None
+            if thread is None:
+                thread = await bot.outbound.submit(("channel", log_channel.id), lambda: message.create_thread(name=f"🔁 Similar reports to #{original_id}"), PRIORITY_LOG)
+                bot.archive.set_thread(original_id, thread.id)
 
-async def run_interview(channel, user, ticket_type):
+            log_embed.title = f"🔁 Similar {ticket_type} Report ({similarity:.0%} match with #{original_id})"
+            sent = await bot.outbound.send(thread, priority=PRIORITY_LOG, embed=log_embed, files=files)
+        except discord.HTTPException as e:
+            print(f"⚠️ Could not thread a duplicate of report #{original_id}: {e}")
+            for file in files:
+                file.reset()  # Rewind, so the normal log message still gets the files
+            return None
+
+        # Counter on the original (editing a message never pings again)
+        count = bot.archive.count_duplicate(original_id)
+        counter = f"🔁 **{count} similar report{'s' if count > 1 else ''}** in the thread below"
+        content = f"{ping} {counter}" if ping else counter
+        try:
+            await bot.outbound.submit(("channel", log_channel.id), lambda: message.edit(content=content), PRIORITY_LOG)
+        except discord.HTTPException as e:
+            print(f"⚠️ Could not update the counter of report #{original_id}: {e}")
+        return sent
+
+async def run_interview(channel, user, ticket_type, resume=None, config=None):
     """
     Runs the entire interview process:
     1. Intro -> 2. Questions -> 3. Validation -> 4. Summary -> 5. Logging
+    `resume` is a saved interview from `bot.checkpoints` (after a restart).
+    `config` is the server's settings; the interview keeps them even if
+    guilds.json is reloaded in the meantime.
     """
+    config = config or bot.guild_config.get(channel.guild.id)
     
     # --- STEP 1: SEND INTRO ---
-    data = INTRO_EMBEDS[ticket_type]
-    formatted_desc = data["Desc"].format(user=user.mention)
-    
-    embed = discord.Embed(
-        title=data["Title"],
-        description=formatted_desc,
-        color=data["Color"]
-    )
-    # Attach the "End Conversation" button
-    await channel.send(embed=embed, view=TicketControls())
+    if resume is None:
+        title, desc_template, color = config.intros[ticket_type]
+        formatted_desc = desc_template.format(user=user.mention)
+        
+        embed = discord.Embed(
+            title=title,
+            description=formatted_desc,
+            color=color
+        )
+        # Attach the "End Conversation" button
+        with stage("intro", ticket_type):
+            await bot.outbound.send(channel, embed=embed, view=TicketControls())
+        bot.checkpoints.start(channel.id, channel.guild.id, user.id, ticket_type, SHARDS.shard_of(channel.guild.id))
+        answers, captured_attachments = {}, {}
+    else:
+        await bot.outbound.send(channel, content=f"♻️ {user.mention} I'm back online! Let's continue where we left off.")
+        saved = resume["answers"]
+        answers = {field: saved[field] for field in config.questions[ticket_type] if field in saved}
+        captured_attachments = resume["attachments"]
     
-    questions = QUESTIONS[ticket_type]
-    answers = {}
-    captured_attachment = None 
+    # Register this interview with the message router
+    bot.interviews.register(channel.id, user.id)
+    bot.interview_tasks[channel.id] = asyncio.current_task()
+    try:
+        await ask_questions(channel, user, ticket_type, answers, captured_attachments, config)
+        bot.checkpoints.finish(channel.id)
+    except Exception:
+        # Something broke (e.g. the channel was deleted). If the bot is shutting
+        # down instead, the task is cancelled and the checkpoint is kept.
+        bot.checkpoints.finish(channel.id)
+        raise
+    finally:
+        if bot.interview_tasks.get(channel.id) is asyncio.current_task():
+            del bot.interview_tasks[channel.id]
+        bot.interviews.unregister(channel.id, user.id)
+
+async def ask_questions(channel, user, ticket_type, answers, captured_attachments, config):
+    """
+    Steps 2 to 5 of the interview. Messages arrive through `bot.interviews`,
+    which only delivers messages from this user in this channel.
+    Every accepted answer is saved to `bot.checkpoints` right away.
+    `answers` and `captured_attachments` (field: list of uploaded files) may
+    already hold answers from before a restart.
+    """
+    questions = config.questions[ticket_type]
+    prompts = config.prompts[ticket_type]
 
-    def check(m):
-        # Ensures the bot only listens to the correct user in the correct channel
-        return m.author == user and m.channel == channel
+    # --- STEP 2a: POP-UP FORM (Optional) ---
+    # Collects every text answer in one go. Only the attachment is asked in the chat.
+    if config.modal_intake[ticket_type] and not answers:
+        intake = IntakeView(user, ticket_type, questions)
+        await bot.outbound.send(channel, content="📝 Click the button below to fill in your report.", view=intake)
+        with stage("form_wait", ticket_type, log_slow=False):
+            timed_out = await intake.wait()
+        if timed_out or not intake.value:
+            await bot.outbound.send(channel, content="❄️ Frozen due to inactivity. Closing.")
+            await asyncio.sleep(5)
+            await bot.outbound.delete(channel)
+            return
+        answers.update(intake.answers)
+        for field, value in intake.answers.items():
+            bot.checkpoints.save_answer(channel.id, field, value)
 
     # --- STEP 2: ASK QUESTIONS LOOP ---
-    for field, question in questions.items():
-        await channel.send(f"🔹 **{field}:** {question}")
+    for field, prompt in prompts.items():
+        if field in answers:
+            continue  # Already answered in the pop-up form
+        bot.interviews.drain(channel.id, user.id)
+        await bot.outbound.send(channel, content=prompt)
         
         # Validation Loop: Keep asking until valid input is received
+        refused = None
         while True:
             try:
-                msg = await bot.wait_for('message', check=check, timeout=300)
+                with stage("question_wait", ticket_type, log_slow=False):
+                    msg = await bot.interviews.wait(channel, user, timeout=300)
                 
-                # Check: Is "Player ID" a number?
-                if field == "Player ID" and not msg.content.isdigit():
-                    await channel.send("⚠️ **Invalid Player ID.** Numbers only please.")
+                # Check: Is the answer valid? (e.g. "Player ID" must be a number)
+                error = validate_answer(field, msg.content, repeated=msg.content == refused)
+                if error:
+                    refused = msg.content
+                    bot.interviews.drain(channel.id, user.id)
+                    await bot.outbound.send(channel, content=error)
                     continue
                 
                 # Check: Did they upload an image?
                 if msg.attachments:
-                    captured_attachment = msg.attachments[0] 
-                    answers[field] = "*(Image Attached)*"
+                    captured_attachments[field] = list(msg.attachments)
+                    answers[field] = attachment_label(msg.attachments)
                 else:
                     answers[field] = msg.content
+                bot.checkpoints.save_answer(channel.id, field, answers[field], captured_attachments.get(field, ()))
                 break # Input is valid, move to next question
 
             except asyncio.TimeoutError:
-                await channel.send("❄️ Frozen due to inactivity. Closing.")
+                await bot.outbound.send(channel, content="❄️ Frozen due to inactivity. Closing.")
                 await asyncio.sleep(5)
-                await channel.delete()
+                await bot.outbound.delete(channel)
                 return
 
     # --- STEP 3: SUMMARY & REVISION LOOP ---
@@ -358,83 +904,113 @@ async def run_interview(channel, user, ticket_type):
         embed.set_thumbnail(url=user.display_avatar.url)
         
         # Send Summary with Yes/No buttons
-        view = ConfirmView()
-        await channel.send(embed=embed, view=view)
-        await view.wait()
+        view = ConfirmView(timeout=300)
+        await bot.outbound.send(channel, embed=embed, view=view)
+        with stage("summary_wait", ticket_type, log_slow=False):
+            timed_out = await view.wait()
+        if timed_out:
+            await bot.outbound.send(channel, content="❄️ Frozen due to inactivity. Closing.")
+            await asyncio.sleep(5)
+            await bot.outbound.delete(channel)
+            return
 
         if view.value is True:
             # --- USER CLICKED YES: SUBMIT TO LOGS ---
-            log_channel_id = LOG_CHANNELS[ticket_type]
-            log_channel = bot.get_channel(log_channel_id)
+            log_channel_id = config.log_channels[ticket_type]
+            log_channel = await bot.get_or_fetch_channel(log_channel_id)
 
             if log_channel:
+                # Is this the same report as a recent one? (e.g. a bug right after a patch)
+                signature = bot.duplicates.signature("\n".join(answers[f] for f in DEDUP_FIELDS if f in answers))
+                scope = (channel.guild.id, ticket_type)
+                match = bot.duplicates.find(scope, signature) if signature is not None else None
+
                 log_embed = discord.Embed(title=f"📄 New {ticket_type} Report", color=discord.Color.green(), timestamp=datetime.datetime.now())
                 log_embed.set_author(name=f"{user.name} (ID: {user.id})", icon_url=user.display_avatar.url)
                 log_embed.set_thumbnail(url=user.display_avatar.url)
                 
+                # Roster notes (e.g. "✅ Frosty" next to the Player ID) save the moderators a lookup
                 for field, ans in answers.items():
-                    log_embed.add_field(name=field, value=ans, inline=False)
+                    log_embed.add_field(name=field, value=(ans + bot.roster.note(field, ans))[:1024], inline=False)
                 
-                # Image Re-upload Logic
-                file_to_send = None
-                if captured_attachment:
-                    try:
-                        # Converts the attachment to a file the bot can upload
-                        file_to_send = await captured_attachment.to_file()
-                        log_embed.set_image(url=f"attachment://{file_to_send.filename}")
-                    except:
-                        pass
-
-                # Ping the relevant Role
-                role_id = ROLE_PINGS.get(ticket_type)
-                if role_id:
-                    await log_channel.send(f"<@&{role_id}>")
-
-                # Send the Log
-                if file_to_send:
-                    await log_channel.send(embed=log_embed, file=file_to_send)
-                else:
-                    await log_channel.send(embed=log_embed)
+                # Image Re-upload Logic: streams every attached file (not just the first)
+                attachments = [a for files in captured_attachments.values() for a in files]
+                relay_started = time.perf_counter()
+                async with bot.relay.open_files(attachments, log_channel.id) as evidence:
+                    record_stage("relay", ticket_type, time.perf_counter() - relay_started)
+                    files_to_send = evidence.files
+                    if evidence.reused:
+                        links = "\n".join(f"[{filename}]({link})" for filename, link in evidence.reused)
+                        log_embed.add_field(name="📎 Already posted", value=links[:1024], inline=False)
+                    first_image = next((f for f in files_to_send if is_image(f.filename)), None)
+                    if first_image:
+                        log_embed.set_image(url=f"attachment://{first_image.filename}")
+
+                    # Send the Log, with the role ping in the same message.
+                    # Likely duplicates go quietly into a thread under the original instead.
+                    role_id = config.role_pings.get(ticket_type)
+                    ping = f"<@&{role_id}>" if role_id else None
+                    log_message = duplicate_of = None
+                    with stage("log_send", ticket_type):
+                        if match:
+                            log_message = await post_duplicate(log_channel, match, ticket_type, ping, log_embed, files_to_send)
+                            duplicate_of = match[0] if log_message else None
+                        if log_message is None:
+                            log_message = await bot.outbound.send(log_channel, priority=PRIORITY_LOG, content=ping, embed=log_embed, files=files_to_send)
+                    bot.relay.uploaded(evidence, log_channel.id, log_message)
 
-                await channel.send("✅ Submitted! Closing channel...")
+                # Keep a searchable copy (the file fields only hold "(Image Attached)")
+                text_fields = [f for f in questions if f not in ATTACHMENT_FIELDS]
+                report_id = bot.archive.add(channel.guild.id, ticket_type, user, answers, log_message, text_fields, signature, duplicate_of)
+                if signature is not None:
+                    bot.duplicates.add(report_id, scope, signature, duplicate_of)
+
+                await bot.outbound.send(channel, content="✅ Submitted! Closing channel...")
                 await asyncio.sleep(5)
-                await channel.delete()
+                await bot.outbound.delete(channel)
                 break
             else:
-                await channel.send("❌ Log channel not found.")
+                await bot.outbound.send(channel, content="❌ Log channel not found.")
                 break
 
         else:
             # --- USER CLICKED NO: REVISE ANSWER ---
-            keys = list(questions.keys())
-            valid_options = ", ".join(keys)
-            await channel.send(f"⚠️ **Type the field name to revise:**\n`{valid_options}`")
+            bot.interviews.drain(channel.id, user.id)
+            await bot.outbound.send(channel, content=config.revise_prompts[ticket_type])
             
             try:
-                retry_msg = await bot.wait_for('message', check=check, timeout=60)
+                with stage("revision_wait", ticket_type, log_slow=False):
+                    retry_msg = await bot.interviews.wait(channel, user, timeout=60)
                 choice = retry_msg.content.strip()
                 
                 # Match user input to a field key (Case Insensitive)
-                matched_key = next((k for k in keys if k.lower() == choice.lower()), None)
+                matched_key = config.field_names[ticket_type].get(choice.lower())
                 
                 if matched_key:
-                    await channel.send(f"🔄 Re-enter value for **{matched_key}**:")
+                    bot.interviews.drain(channel.id, user.id)
+                    await bot.outbound.send(channel, content=f"🔄 Re-enter value for **{matched_key}**:")
                     # Inner Loop for Revision Validation
+                    refused = None
                     while True:
-                        new_msg = await bot.wait_for('message', check=check, timeout=120)
-                        if matched_key == "Player ID" and not new_msg.content.isdigit():
-                            await channel.send("⚠️ **Invalid Player ID.** Numbers only.")
+                        with stage("revision_wait", ticket_type, log_slow=False):
+                            new_msg = await bot.interviews.wait(channel, user, timeout=120)
+                        error = validate_answer(matched_key, new_msg.content, repeated=new_msg.content == refused)
+                        if error:
+                            refused = new_msg.content
+                            bot.interviews.drain(channel.id, user.id)
+                            await bot.outbound.send(channel, content=error)
                             continue
                         
                         if new_msg.attachments:
-                            captured_attachment = new_msg.attachments[0]
-                            answers[matched_key] = "*(Image Attached)*"
+                            captured_attachments[matched_key] = list(new_msg.attachments)
+                            answers[matched_key] = attachment_label(new_msg.attachments)
                         else:
-                            if answers[matched_key] == "*(Image Attached)*": captured_attachment = None
+                            captured_attachments.pop(matched_key, None)
                             answers[matched_key] = new_msg.content
+                        bot.checkpoints.save_answer(channel.id, matched_key, answers[matched_key], captured_attachments.get(matched_key, ()))
                         break
                 else:
-                    await channel.send("❌ Invalid field.")
+                    await bot.outbound.send(channel, content="❌ Invalid field.")
 
             except asyncio.TimeoutError:
                 break
@@ -443,7 +1019,7 @@ async def run_interview(channel, user, ticket_type):
 # 🛠️ SECTION 6: COMMANDS & STARTUP
 # ==========================================
 
-@bot.command()
+@commands.command()
 @commands.has_permissions(manage_channels=True)
 async def close(ctx):
     """
@@ -451,13 +1027,37 @@ async def close(ctx):
     Usage: !close
     """
     if isinstance(ctx.channel, discord.TextChannel) and ctx.channel.name.startswith(("bug-", "suggestion-", "complaint-")):
+        bot.checkpoints.finish(ctx.channel.id)
         await ctx.send("⛔ **Admin Force Close Initiated.**")
         await asyncio.sleep(2)
         await ctx.channel.delete()
     else:
         await ctx.send("You can only use this inside a Ticket channel.")
 
-@bot.command()
+@commands.command()
+@commands.has_permissions(manage_channels=True)
+async def search(ctx, *, query: str = ""):
+    """
+    Admin Command: Searches the archive of submitted reports.
+    Usage: !search crash on login
+           !search type:bug player:12345678
+           !search name:frosty page:2 lag*
+    """
+    filters, words = parse_search(query)
+    if not filters.keys() - {"page"} and not words:
+        await ctx.send("🔎 **Usage:** `!search words` with optional `type:bug`, `player:12345678`, `name:frosty`, `page:2`")
+        return
+
+    view = SearchResults(ctx.author, ctx.guild.id, filters, words)
+    page = filters.get("page", "1")
+    view.page = int(page) if page.isdigit() and int(page) > 0 else 1
+    embed = view.render()
+    if view.page > view.pages:
+        view.page = view.pages
+        embed = view.render()
+    await ctx.send(embed=embed, view=view)
+
+@commands.command()
 async def setup(ctx):
     """
     Setup Command: Deploys the main menu with buttons.
@@ -483,8 +1083,42 @@ Found someone breaking the peace? 😠 An unauthorized attack on your city? Some
     embed = discord.Embed(title="Greetings, Chiefs! 👋", description=desc, color=discord.Color.from_rgb(52, 152, 219))
     await ctx.send(embed=embed, view=TicketLauncher())
 
-# Start the Flask Web Server (To keep Render happy)
-keep_alive()
+def create_bot():
+    """
+    Creates the bot: opens the databases and registers the commands.
+    Used by main() and by tools like the load test in bench/.
+    """
+    global bot
+    bot = PersistentBot()
+    for command in (close, search, setup):
+        bot.add_command(command)
+    bot.startup.mark("setup")
+    return bot
+
+async def start(token):
+    """
+    Starts the web server first, then logs in. That way Render finds the port
+    (and /healthz answers "unhealthy") even while the login is slow or failing.
+    """
+    # Imported here, so tools that only import this file don't load the web server.
+    from keep_alive import keep_alive
+    async with create_bot() as client:  # Closes the bot (and the web server) on the way out
+        client.web_runner = await keep_alive(client)
+        await client.start(token)
+
+def main():
+    """Starts the Discord Bot (`python bot.py`)."""
+    # Safety check: Stops the bot immediately if no token is found.
+    if TOKEN is None:
+        print("❌ Error: DISCORD_TOKEN not found! Check your .env file or Cloud Settings.")
+        exit()
+
+    discord.utils.setup_logging()  # bot.run() used to do this
+    try:
+        asyncio.run(start(TOKEN))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C: the bot was already closed
+
+if __name__ == "__main__":
+    main()
 
-# Start the Discord Bot
-bot.run(TOKEN)
@@ -0,0 +1,121 @@
+import collections
+import json
+import os
+import sqlite3
+import time
+
+# ==========================================
+# 💾 INTERVIEW CHECKPOINTS
+# ==========================================
+"""
+Saves every accepted answer to a small SQLite file as soon as it is given.
+
+If the bot restarts in the middle of an interview, the saved answers are
+loaded again and the interview continues at the next unanswered question,
+so nobody has to type their whole report again.
+
+When several bot processes share the file (see sharding.py), every
+interview is owned by the shard of its server, and each process only
+resumes its own.
+"""
+
+# Where the interviews are saved. Can be changed with an Environment Variable.
+CHECKPOINT_DB = os.getenv('CHECKPOINT_DB', 'interviews.db')
+
+# What we remember about an uploaded file (works with the evidence relay)
+SavedAttachment = collections.namedtuple("SavedAttachment", "url filename size")
+
+
+class InterviewCheckpoints:
+    """
+    One row per open interview, plus one row per answer.
+    """
+    def __init__(self, path=CHECKPOINT_DB):
+        self.db = sqlite3.connect(path, isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS interviews (
+                channel_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                ticket_type TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                shard_id INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(interviews)")}
+        if "shard_id" not in columns:  # Files saved before sharding existed
+            self.db.execute("ALTER TABLE interviews ADD COLUMN shard_id INTEGER NOT NULL DEFAULT 0")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                channel_id INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                attachments TEXT NOT NULL DEFAULT '[]',
+                PRIMARY KEY (channel_id, field)
+            )
+        """)
+
+    def start(self, channel_id, guild_id, user_id, ticket_type, shard_id=0):
+        """Remembers that an interview is running in this channel (owned by `shard_id`)."""
+        self.db.execute(
+            "INSERT OR REPLACE INTO interviews VALUES (?, ?, ?, ?, ?, ?)",
+            (channel_id, guild_id, user_id, ticket_type, time.time(), shard_id)
+        )
+
+    def save_answer(self, channel_id, field, value, attachments=()):
+        """Saves (or overwrites) one answer."""
+        files = [[a.url, a.filename, a.size] for a in attachments]
+        self.db.execute(
+            "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+            (channel_id, field, value, json.dumps(files))
+        )
+
+    def finish(self, channel_id):
+        """Forgets the interview (submitted, closed or abandoned)."""
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.execute("DELETE FROM answers WHERE channel_id = ?", (channel_id,))
+            self.db.execute("DELETE FROM interviews WHERE channel_id = ?", (channel_id,))
+
+    def load_all(self, owns=None):
+        """
+        Returns every saved interview as a dictionary with its answers and attachments.
+        `owns(guild_id)` picks the interviews of this process (default: all of them).
+        """
+        saved = {}
+        rows = self.db.execute("SELECT channel_id, guild_id, user_id, ticket_type, started_at, shard_id FROM interviews")
+        for channel_id, guild_id, user_id, ticket_type, started_at, shard_id in rows:
+            if owns is not None and not owns(guild_id):
+                continue
+            saved[channel_id] = {
+                "channel_id": channel_id,
+                "guild_id": guild_id,
+                "user_id": user_id,
+                "ticket_type": ticket_type,
+                "started_at": started_at,
+                "shard_id": shard_id,
+                "answers": {},
+                "attachments": {},
+            }
+
+        for channel_id, field, value, files in self.db.execute("SELECT channel_id, field, value, attachments FROM answers"):
+            interview = saved.get(channel_id)
+            if interview is None:
+                continue
+            interview["answers"][field] = value
+            files = [SavedAttachment(*f) for f in json.loads(files)]
+            if files:
+                interview["attachments"][field] = files
+        return list(saved.values())
+
+    def channel_ids(self):
+        """Returns the IDs of all channels with a saved interview."""
+        return {row[0] for row in self.db.execute("SELECT channel_id FROM interviews")}
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+
+    def close(self):
+        self.db.close()
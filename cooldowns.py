@@ -0,0 +1,123 @@
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+# ==========================================
+# ⏲️ COOLDOWN STORE
+# ==========================================
+"""
+Remembers when each user may open their next ticket.
+
+- Expired cooldowns are removed automatically (a heap sorted by expiry time),
+  so memory only holds users who are actually on cooldown.
+- Every change is written to a small SQLite file (WAL mode) and loaded again
+  at startup, so a restart does not reset everyone's cooldown.
+- With `shared=True` (several bot processes, see sharding.py) the SQLite
+  file is the only copy: every check reads and writes it in one locked
+  transaction, so a user can't get past the cooldown by clicking in a
+  server that is run by another process.
+"""
+
+# Where the cooldowns are saved. Can be changed with an Environment Variable.
+COOLDOWN_DB = os.getenv('COOLDOWN_DB', 'cooldowns.db')
+
+
+class CooldownStore:
+    """
+    Tracks cooldowns as {user_id: expires_at}.
+    """
+    def __init__(self, path=COOLDOWN_DB, shared=False):
+        self.shared = shared
+        self.shared_writes = 0
+        self.expires = {}  # user_id: time when the cooldown ends
+        self.heap = []     # (expires_at, user_id), soonest first
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS cooldowns (user_id INTEGER PRIMARY KEY, expires_at REAL NOT NULL)")
+        if not shared:
+            self.load()
+
+    def load(self):
+        """Reads the cooldowns that are still running from the database."""
+        now = time.time()
+        with self.lock:
+            self.db.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            for user_id, expires_at in self.db.execute("SELECT user_id, expires_at FROM cooldowns"):
+                self.expires[user_id] = expires_at
+                self.heap.append((expires_at, user_id))
+            heapq.heapify(self.heap)
+
+    def _evict(self, now):
+        """Removes every cooldown that has already ended. Caller holds the lock."""
+        evicted = False
+        while self.heap and self.heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self.heap)
+            if self.expires.get(user_id) == expires_at:
+                del self.expires[user_id]
+                evicted = True
+        if evicted:
+            self.db.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+
+    def check_and_set(self, user_id, tier_limit):
+        """
+        Checks the cooldown and starts a new one in a single step.
+        Returns 0 if the user may continue, otherwise the seconds left to wait.
+        """
+        if self.shared:
+            return self._check_and_set_shared(user_id, tier_limit)
+        with self.lock:
+            now = time.time()
+            self._evict(now)
+
+            expires_at = self.expires.get(user_id)
+            if expires_at is not None and expires_at > now:
+                return expires_at - now
+
+            expires_at = now + tier_limit
+            self.expires[user_id] = expires_at
+            heapq.heappush(self.heap, (expires_at, user_id))
+            self.db.execute("INSERT OR REPLACE INTO cooldowns (user_id, expires_at) VALUES (?, ?)", (user_id, expires_at))
+            return 0
+
+    def _check_and_set_shared(self, user_id, tier_limit):
+        """check_and_set() straight on the database, locked against the other processes."""
+        with self.lock:
+            now = time.time()
+            self.db.execute("BEGIN IMMEDIATE")  # Takes the write lock before reading
+            try:
+                row = self.db.execute("SELECT expires_at FROM cooldowns WHERE user_id = ?", (user_id,)).fetchone()
+                if row is not None and row[0] > now:
+                    remaining = row[0] - now
+                else:
+                    remaining = 0
+                    self.db.execute("INSERT OR REPLACE INTO cooldowns (user_id, expires_at) VALUES (?, ?)", (user_id, now + tier_limit))
+                    self.shared_writes += 1
+                    if self.shared_writes % 1000 == 0:
+                        self.db.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))  # Tidy up now and then
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            return remaining
+
+    def clear(self, user_id):
+        """Ends a user's cooldown early (e.g. when their ticket was turned away)."""
+        with self.lock:
+            if self.expires.pop(user_id, None) is not None or self.shared:
+                self.db.execute("DELETE FROM cooldowns WHERE user_id = ?", (user_id,))
+
+    def __len__(self):
+        if self.shared:
+            with self.lock:
+                return self.db.execute("SELECT COUNT(*) FROM cooldowns WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        with self.lock:
+            self._evict(time.time())
+            return len(self.expires)
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,168 @@
+import array
+import asyncio
+import collections
+import os
+import random
+import re
+import time
+import zlib
+
+# ==========================================
+# 🔁 DUPLICATE REPORT DETECTOR
+# ==========================================
+"""
+Spots reports that say (nearly) the same thing as a recent one, e.g. the
+same bug reported 30 times after a game patch.
+
+How it works (MinHash + LSH):
+- The text is cut into overlapping 5-letter pieces ("shingles").
+- A MinHash signature (NUM_PERM numbers) is computed from them. Two texts
+  share about as many signature numbers as they share shingles.
+- The signature is split into LSH_BANDS bands. Reports with one identical
+  band land in the same bucket, so a lookup only checks a handful of
+  candidates instead of every report. The cost stays the same no matter
+  how many reports there are.
+- Candidates are confirmed by comparing the whole signature.
+
+Signatures are saved in the report archive, so the index is rebuilt
+at startup without re-reading any text.
+"""
+
+# Numbers per signature, and how many bands they are split into.
+# 32 / 8 = 4 numbers per band: texts that are ~60% alike usually share a bucket.
+NUM_PERM = 32
+LSH_BANDS = 8
+
+# How alike (0 to 1) two reports must be to count as duplicates
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', 0.7))
+
+# Only reports from the last DEDUP_WINDOW seconds count, and at most DEDUP_MAX_REPORTS of them
+DEDUP_WINDOW = int(os.getenv('DEDUP_WINDOW', 7 * 24 * 60 * 60))
+DEDUP_MAX_REPORTS = int(os.getenv('DEDUP_MAX_REPORTS', 20000))
+
+# Texts shorter than this (after cleanup) are never called duplicates
+MIN_TEXT_LENGTH = 20
+
+SHINGLE_SIZE = 5
+PRIME = (1 << 31) - 1  # Signature numbers fit in 4 bytes
+
+WORDS = re.compile(r"[^\w]+")
+
+
+class DuplicateDetector:
+    """
+    An in-memory LSH index of recent report signatures, per server and ticket type.
+    """
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, window=DEDUP_WINDOW, max_reports=DEDUP_MAX_REPORTS):
+        self.threshold = threshold
+        self.window = window
+        self.max_reports = max_reports
+
+        # Fixed seed: signatures saved in the archive must stay comparable after a restart
+        rng = random.Random(0x5EED)
+        self.perms = [(rng.randrange(1, PRIME), rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+        self.rows = NUM_PERM // LSH_BANDS
+
+        self.buckets = {}                  # (scope, band, band bytes): [report ids]
+        self.reports = {}                  # report_id: (scope, signature, added_at, root_id)
+        self.order = collections.deque()   # report ids, oldest first
+        self.thread_locks = {}             # root report id: asyncio.Lock (one thread per original)
+
+        # Counters
+        self.checked = 0
+        self.candidates = 0
+        self.duplicates = 0
+
+    def signature(self, text):
+        """Returns the MinHash signature of a text (an array of NUM_PERM numbers), or None if it is too short."""
+        text = WORDS.sub(" ", text.lower()).strip()
+        if len(text) < MIN_TEXT_LENGTH:
+            return None
+        shingles = {zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)}
+        return array.array("I", (min((a * x + b) % PRIME for x in shingles) for a, b in self.perms))
+
+    def bands(self, scope, signature):
+        rows = self.rows
+        return [(scope, band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(LSH_BANDS)]
+
+    def find(self, scope, signature):
+        """
+        Looks for a recent report like this one.
+        Returns (original report id, similarity) or None.
+        `scope` keeps servers and ticket types apart, e.g. (guild_id, "Bug").
+        """
+        self.checked += 1
+        self._evict(time.time())
+        seen = set()
+        best = None
+        for key in self.bands(scope, signature):
+            for report_id in self.buckets.get(key, ()):
+                if report_id in seen:
+                    continue
+                seen.add(report_id)
+                other = self.reports[report_id][1]
+                similarity = sum(1 for a, b in zip(signature, other) if a == b) / NUM_PERM
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (report_id, similarity)
+        self.candidates += len(seen)
+        if best is None:
+            return None
+        self.duplicates += 1
+        root_id = self.reports[best[0]][3]  # Duplicates of duplicates go to the first report
+        return root_id, best[1]
+
+    def add(self, report_id, scope, signature, root_id=None, added_at=None):
+        """Indexes a report. `root_id` is the original it duplicates (if any)."""
+        if report_id in self.reports:
+            return  # Submitted while the index was being rebuilt at startup
+        added_at = added_at or time.time()
+        self.reports[report_id] = (scope, signature, added_at, root_id or report_id)
+        # Keep `order` oldest first: rows loaded at startup are older than reports submitted meanwhile
+        position = len(self.order)
+        while position and self.reports[self.order[position - 1]][2] > added_at:
+            position -= 1
+        self.order.insert(position, report_id)
+        for key in self.bands(scope, signature):
+            self.buckets.setdefault(key, []).append(report_id)
+        if len(self.order) > self.max_reports:
+            self._remove(self.order.popleft())
+
+    def _remove(self, report_id):
+        scope, signature, _, _ = self.reports.pop(report_id)
+        self.thread_locks.pop(report_id, None)
+        for key in self.bands(scope, signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.remove(report_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def _evict(self, now):
+        """Forgets reports older than the window."""
+        while self.order and now - self.reports[self.order[0]][2] > self.window:
+            self._remove(self.order.popleft())
+
+    def load(self, rows):
+        """Rebuilds the index from `ReportArchive.recent_signatures()`."""
+        for report_id, guild_id, ticket_type, signature, duplicate_of, submitted_at in rows:
+            self.add(report_id, (guild_id, ticket_type), array.array("I", signature), duplicate_of, submitted_at)
+
+    def thread_lock(self, root_id):
+        """A lock per original report, so two duplicates at once don't both create a thread."""
+        lock = self.thread_locks.get(root_id)
+        if lock is None:
+            lock = self.thread_locks[root_id] = asyncio.Lock()
+        return lock
+
+    def __len__(self):
+        return len(self.reports)
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "indexed": len(self.reports),
+            "buckets": len(self.buckets),
+            "checked": self.checked,
+            "avg_candidates": self.candidates / self.checked if self.checked else 0.0,
+            "duplicates": self.duplicates,
+        }
@@ -0,0 +1,99 @@
+import asyncio
+import collections
+
+# ==========================================
+# 📬 INTERVIEW MESSAGE ROUTER
+# ==========================================
+"""
+Routes every incoming message straight to the interview that is waiting for it.
+
+Instead of one `bot.wait_for` listener per open ticket (which makes discord.py
+run every check function on every message), each interview registers a small
+queue keyed by (channel_id, user_id). A single `on_message` listener does one
+dictionary lookup per message, no matter how many tickets are open.
+
+Messages typed while the bot isn't asking anything (e.g. while the summary
+buttons are shown) would otherwise sit in the queue and be taken as the
+answer to the next question, so the interview calls `drain` right before
+each prompt.
+"""
+
+# How many unread messages we keep per interview before dropping new ones
+QUEUE_SIZE = 10
+
+
+class InterviewDispatcher:
+    """
+    Keeps one message queue per open interview.
+    """
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.queues = {}  # (channel_id, user_id): asyncio.Queue
+        self.channels = collections.Counter()  # channel_id: number of interviews in it
+
+        # Counters (useful to spot problems during big events)
+        self.routed = 0     # Messages delivered to an interview
+        self.dropped = 0    # Messages lost because an interview queue was full
+        self.unmatched = 0  # Messages that did not belong to any interview
+        self.discarded = 0  # Messages thrown away by `drain` (typed before the question was asked)
+
+    def register(self, channel_id, user_id):
+        """Opens a queue for this interview (or returns the existing one)."""
+        key = (channel_id, user_id)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self.queues[key] = queue
+            self.channels[channel_id] += 1
+        return queue
+
+    def unregister(self, channel_id, user_id):
+        """Closes the queue once the interview is over."""
+        if self.queues.pop((channel_id, user_id), None) is not None:
+            self.channels[channel_id] -= 1
+            if not self.channels[channel_id]:
+                del self.channels[channel_id]
+
+    def is_active(self, channel_id):
+        """Returns True if any interview is running in this channel."""
+        return channel_id in self.channels
+
+    async def feed(self, message):
+        """
+        The single `on_message` listener. O(1) per message.
+        """
+        queue = self.queues.get((message.channel.id, message.author.id))
+        if queue is None:
+            self.unmatched += 1
+            return
+
+        try:
+            queue.put_nowait(message)
+            self.routed += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def drain(self, channel_id, user_id):
+        """Throws away the messages nobody asked for yet. Call it right before sending a prompt."""
+        queue = self.queues.get((channel_id, user_id))
+        while queue is not None and not queue.empty():
+            queue.get_nowait()
+            self.discarded += 1
+
+    async def wait(self, channel, user, timeout):
+        """
+        Drop-in replacement for `bot.wait_for('message', check=check, timeout=...)`.
+        Raises asyncio.TimeoutError if the user does not answer in time.
+        """
+        queue = self.register(channel.id, user.id)
+        return await asyncio.wait_for(queue.get(), timeout=timeout)
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "open_interviews": len(self.queues),
+            "routed": self.routed,
+            "dropped": self.dropped,
+            "unmatched": self.unmatched,
+            "discarded": self.discarded,
+        }
@@ -0,0 +1,236 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import time
+
+# ==========================================
+# 🗂️ EVIDENCE CACHE
+# ==========================================
+"""
+Remembers evidence files by their content (SHA-256), so the same
+screenshot isn't downloaded and uploaded again and again.
+
+- Files are kept on disk under their hash (EVIDENCE_DIR), up to
+  EVIDENCE_CACHE_BYTES in total. The least recently used ones are
+  deleted first.
+- The hash of every attachment is remembered by its link (without the
+  expiring ?ex= part), so the same attachment is never downloaded twice.
+- It is also remembered by what Discord tells us about the file (name,
+  size, type and picture size). The same screenshot attached again (e.g.
+  when revising an answer, or in another ticket) gets a new link, but is
+  recognised by these and not downloaded again. If two different files
+  ever turn out to share them, that combination is no longer trusted.
+- Every upload to a log channel is remembered too. When the same file
+  (same hash) is sent to that channel again, the report links to the
+  earlier message instead of uploading another copy.
+
+The index is a small SQLite file (WAL mode), shared by all bot processes.
+The size of the store is counted in the index, so the cap holds for all
+of them together.
+"""
+
+# Where the index and the files are kept. Can be changed with Environment Variables.
+EVIDENCE_DB = os.getenv('EVIDENCE_DB', 'evidence.db')
+EVIDENCE_DIR = os.getenv('EVIDENCE_DIR', 'evidence')
+
+# Most bytes kept on disk (least recently used files are deleted first)
+EVIDENCE_CACHE_BYTES = int(os.getenv('EVIDENCE_CACHE_BYTES', 200 * 1024 * 1024))
+
+# Earlier uploads are only linked to for this long (seconds), in case old log messages get cleaned up
+EVIDENCE_REUSE_AGE = int(os.getenv('EVIDENCE_REUSE_AGE', 30 * 24 * 60 * 60))
+
+
+def attachment_key(attachment):
+    """The link of an attachment without the expiry parameters (the same for every copy of the link)."""
+    return attachment.url.split("?", 1)[0]
+
+
+def fingerprint(attachment):
+    """What Discord tells us about a file, which stays the same when it is uploaded again."""
+    width, height = getattr(attachment, "width", None), getattr(attachment, "height", None)
+    return f"{attachment.filename}|{attachment.size}|{getattr(attachment, 'content_type', None)}|{width}x{height}"
+
+
+class EvidenceCache:
+    """
+    Content-addressed store of evidence files, plus where each file was already uploaded.
+    """
+    def __init__(self, path=EVIDENCE_DB, directory=EVIDENCE_DIR, max_bytes=EVIDENCE_CACHE_BYTES, reuse_age=EVIDENCE_REUSE_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.reuse_age = reuse_age
+
+        self.db = sqlite3.connect(path, isolation_level=None, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS blobs_by_use ON blobs (last_used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS attachments (key TEXT PRIMARY KEY, hash TEXT NOT NULL, size INTEGER NOT NULL)")
+        # hash '' = two different files had this fingerprint, so it is not used
+        self.db.execute("CREATE TABLE IF NOT EXISTS fingerprints (fingerprint TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                hash TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                jump_url TEXT NOT NULL,
+                uploaded_at REAL NOT NULL,
+                PRIMARY KEY (hash, channel_id)
+            )
+        """)
+        self.stored_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        self.writing = set()  # Hashes being copied into the store right now
+
+        # Counters
+        self.lookups = 0
+        self.download_hits = 0
+        self.upload_hits = 0
+        self.bytes_saved = 0
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def known(self, attachment):
+        """The hash of an attachment that was seen before (same link, or same file uploaded again), or None."""
+        row = self.db.execute("SELECT hash, size FROM attachments WHERE key = ?", (attachment_key(attachment),)).fetchone()
+        if row is not None and row[1] == attachment.size:
+            return row[0]
+        row = self.db.execute("SELECT hash FROM fingerprints WHERE fingerprint = ?", (fingerprint(attachment),)).fetchone()
+        return row[0] if row and row[0] else None
+
+    def remember(self, attachment, digest):
+        """Remembers the hash of a downloaded attachment, by its link and by its fingerprint."""
+        self.db.execute(
+            "INSERT OR REPLACE INTO attachments (key, hash, size) VALUES (?, ?, ?)",
+            (attachment_key(attachment), digest, attachment.size)
+        )
+        # A fingerprint seen with another hash before can't tell the files apart: stop using it
+        self.db.execute(
+            "INSERT INTO fingerprints (fingerprint, hash) VALUES (?, ?)"
+            " ON CONFLICT (fingerprint) DO UPDATE SET hash = '' WHERE hash != excluded.hash",
+            (fingerprint(attachment), digest)
+        )
+
+    def open(self, digest):
+        """Opens a stored file for reading (and marks it as recently used), or returns None."""
+        try:
+            f = open(self.path(digest), "rb")
+        except FileNotFoundError:
+            self._forget(digest)
+            return None
+        self.db.execute("UPDATE blobs SET last_used = ? WHERE hash = ?", (time.time(), digest))
+        return f
+
+    async def store(self, digest, fp, size):
+        """
+        Copies a downloaded file (rewound afterwards) into the store.
+        Files bigger than a quarter of the cap are not kept.
+        """
+        if digest in self.writing or size > self.max_bytes // 4:
+            return
+        if self.db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+            return
+        self.writing.add(digest)
+        try:
+            # Files can be up to 50 MB: the copy runs in a worker thread so it never blocks the bot
+            await asyncio.get_running_loop().run_in_executor(None, self._write, fp, self.path(digest))
+            error = None
+        except OSError as e:
+            error = e
+        finally:
+            self.writing.discard(digest)
+        fp.seek(0)  # Not when cancelled: the thread may still be reading it
+        if error is not None:
+            print(f"⚠️ Could not keep evidence file {digest[:12]}: {error}")
+            return
+        self.db.execute("INSERT OR REPLACE INTO blobs (hash, size, last_used) VALUES (?, ?, ?)", (digest, size, time.time()))
+        self.stored_bytes += size
+        self._evict()
+
+    @staticmethod
+    def _write(fp, target):
+        """Copies `fp` to `target` (runs in a worker thread). Never leaves a half-written file under the hash."""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.{os.getpid()}.part"
+        try:
+            with open(partial, "wb") as out:
+                shutil.copyfileobj(fp, out)
+            os.replace(partial, target)
+        except BaseException:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            raise
+
+    def _forget(self, digest):
+        row = self.db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is not None:
+            self.db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            self.stored_bytes -= row[0]
+
+    def _evict(self):
+        """
+        Deletes the least recently used files until the store fits in the cap.
+        The total is summed up again in the index, because other processes add files too.
+        """
+        removed = []
+        self.db.execute("BEGIN IMMEDIATE")  # Takes the write lock before reading
+        try:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            while total > self.max_bytes:
+                digest, size = self.db.execute("SELECT hash, size FROM blobs ORDER BY last_used LIMIT 1").fetchone()
+                self.db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                total -= size
+                removed.append(digest)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.stored_bytes = total
+        for digest in removed:
+            try:
+                os.remove(self.path(digest))
+            except FileNotFoundError:
+                pass
+
+    def uploaded(self, digest, channel_id):
+        """The link to a recent message in this channel that already has the file, or None."""
+        row = self.db.execute(
+            "SELECT jump_url FROM uploads WHERE hash = ? AND channel_id = ? AND uploaded_at > ?",
+            (digest, channel_id, time.time() - self.reuse_age)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record_upload(self, digests, channel_id, jump_url):
+        """Remembers that a message in `channel_id` has these files."""
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO uploads (hash, channel_id, jump_url, uploaded_at) VALUES (?, ?, ?, ?)",
+            [(digest, channel_id, jump_url, now) for digest in digests]
+        )
+
+    def count(self, size, downloaded, uploaded):
+        """Counts one attachment and the bytes it did not have to move."""
+        self.lookups += 1
+        if not downloaded:
+            self.download_hits += 1
+            self.bytes_saved += size
+        if not uploaded:
+            self.upload_hits += 1
+            self.bytes_saved += size
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        hits = self.download_hits + self.upload_hits
+        return {
+            "stored_bytes": self.stored_bytes,
+            "lookups": self.lookups,
+            "download_hits": self.download_hits,
+            "upload_hits": self.upload_hits,
+            "hit_ratio": hits / (2 * self.lookups) if self.lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,290 @@
+import asyncio
+import json
+import os
+import string
+
+import discord
+
+# ==========================================
+# 🗺️ PER-SERVER CONFIGURATION
+# ==========================================
+"""
+Lets one bot serve many servers, each with its own log channels, pings,
+cooldowns and questions.
+
+The settings live in a JSON file (guilds.json):
+
+    {
+      "default": { ...settings for every server... },
+      "guilds": {
+        "123456789012345678": { ...only what is different for this server... }
+      }
+    }
+
+Every setting can be left out; missing ones come from "default", and then
+from the built-in values in bot.py. Everything is checked when the file is
+loaded (unknown {placeholders}, missing ticket types, wrong IDs...), and the
+question prompts are built once, so a ticket only does a dictionary lookup.
+
+The file is checked for changes every few seconds and reloaded without a
+restart. A broken file is reported and ignored (the old settings stay).
+Running interviews keep the settings they started with.
+"""
+
+# Where the settings are. Can be changed with an Environment Variable.
+GUILD_CONFIG_PATH = os.getenv('GUILD_CONFIG', 'guilds.json')
+
+# How often to check the file for changes (seconds)
+GUILD_CONFIG_POLL = float(os.getenv('GUILD_CONFIG_POLL', 10))
+
+# The ticket types the launcher buttons create. Every server needs all three.
+TICKET_TYPES = ("Bug", "Suggestion", "Complaint")
+
+# Cooldown tiers, from the most to the least trusted
+COOLDOWN_TIERS = ("owner", "admin", "verified", "member")
+
+# The settings a server can have
+SETTINGS = (
+    "log_channels", "role_pings", "verified_role_id", "cooldowns",
+    "modal_intake", "ephemeral_messages", "intro_embeds", "questions",
+)
+
+
+class ConfigError(ValueError):
+    """Raised when the settings file is invalid."""
+
+
+class Template:
+    """
+    A message with {placeholders}. Unknown placeholders are refused at load
+    time, and messages without any are returned as-is (no formatting at all).
+    """
+    __slots__ = ("text", "static")
+
+    def __init__(self, text, allowed, where):
+        if not isinstance(text, str) or not text:
+            raise ConfigError(f"{where}: must be a non-empty text")
+        names = set()
+        try:
+            for _, name, _, _ in string.Formatter().parse(text):
+                if name is not None:
+                    names.add(name)
+        except ValueError as e:
+            raise ConfigError(f"{where}: {e}") from None
+        unknown = names - set(allowed)
+        if unknown:
+            raise ConfigError(f"{where}: unknown placeholder(s) {', '.join('{' + n + '}' for n in sorted(unknown))} (allowed: {', '.join('{' + n + '}' for n in allowed)})")
+        self.text = text
+        self.static = text if not names else None
+
+    def format(self, **values):
+        if self.static is not None:
+            return self.static
+        return self.text.format(**values)
+
+
+def parse_color(value, where):
+    """discord.Color, 0xRRGGBB as a number, or "#RRGGBB"."""
+    if isinstance(value, discord.Color):
+        return value
+    try:
+        if isinstance(value, str):
+            return discord.Color(int(value.lstrip("#"), 16))
+        return discord.Color(int(value))
+    except (TypeError, ValueError):
+        raise ConfigError(f"{where}: not a color: {value!r}") from None
+
+
+def parse_id(value, where, optional=False):
+    if value is None and optional:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+        raise ConfigError(f"{where}: not a Discord ID: {value!r}")
+    return int(value)
+
+
+def per_type(settings, key, where, required=True):
+    """Settings with one entry per ticket type (`required`: for every type)."""
+    values = settings[key]
+    if not isinstance(values, dict):
+        raise ConfigError(f"{where}.{key}: must be an object")
+    if not required:
+        return values
+    missing = [t for t in TICKET_TYPES if t not in values]
+    if missing:
+        raise ConfigError(f"{where}.{key}: missing {', '.join(missing)}")
+    return values
+
+
+class GuildConfig:
+    """
+    The checked and ready-to-use settings of one server.
+    """
+    __slots__ = (
+        "guild_id", "log_channels", "role_pings", "verified_role_id", "cooldowns",
+        "modal_intake", "ephemeral_messages", "intros", "questions",
+        "prompts", "revise_prompts", "field_names",
+    )
+
+    def __init__(self, guild_id, settings, where):
+        self.guild_id = guild_id
+        unknown = set(settings) - set(SETTINGS)
+        if unknown:
+            raise ConfigError(f"{where}: unknown setting(s) {', '.join(sorted(unknown))}")
+        missing = [key for key in SETTINGS if key not in settings]
+        if missing:
+            raise ConfigError(f"{where}: missing {', '.join(missing)}")
+
+        self.log_channels = {t: parse_id(v, f"{where}.log_channels.{t}") for t, v in per_type(settings, "log_channels", where).items()}
+        self.role_pings = {t: parse_id(v, f"{where}.role_pings.{t}", optional=True) for t, v in per_type(settings, "role_pings", where, required=False).items()}
+        self.verified_role_id = parse_id(settings["verified_role_id"], f"{where}.verified_role_id", optional=True)
+
+        cooldowns = settings["cooldowns"]
+        if not isinstance(cooldowns, dict) or set(cooldowns) != set(COOLDOWN_TIERS):
+            raise ConfigError(f"{where}.cooldowns: needs exactly {', '.join(COOLDOWN_TIERS)}")
+        for tier, seconds in cooldowns.items():
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds < 0:
+                raise ConfigError(f"{where}.cooldowns.{tier}: must be a number of seconds")
+        self.cooldowns = dict(cooldowns)
+
+        self.modal_intake = {t: bool(per_type(settings, "modal_intake", where, required=False).get(t)) for t in TICKET_TYPES}
+
+        self.ephemeral_messages = {
+            t: Template(v, ("user", "channel"), f"{where}.ephemeral_messages.{t}")
+            for t, v in per_type(settings, "ephemeral_messages", where).items()
+        }
+
+        self.intros = {}
+        for t, intro in per_type(settings, "intro_embeds", where).items():
+            at = f"{where}.intro_embeds.{t}"
+            if not isinstance(intro, dict):
+                raise ConfigError(f"{at}: must be an object")
+            title = Template(intro.get("Title"), (), f"{at}.Title").static
+            self.intros[t] = (title, Template(intro.get("Desc"), ("user",), f"{at}.Desc"), parse_color(intro.get("Color"), f"{at}.Color"))
+
+        # Questions, plus the chat messages built from them
+        self.questions = {}
+        self.prompts = {}
+        self.revise_prompts = {}
+        self.field_names = {}
+        for t, questions in per_type(settings, "questions", where).items():
+            at = f"{where}.questions.{t}"
+            if not isinstance(questions, dict) or not questions:
+                raise ConfigError(f"{at}: must list at least one question")
+            for field, question in questions.items():
+                if not field or len(field) > 45:
+                    raise ConfigError(f"{at}: field names must be 1 to 45 characters: {field!r}")
+                if not isinstance(question, str) or not question:
+                    raise ConfigError(f"{at}.{field}: must be a non-empty text")
+            self.questions[t] = dict(questions)
+            self.prompts[t] = {field: f"🔹 **{field}:** {question}" for field, question in questions.items()}
+            self.revise_prompts[t] = f"⚠️ **Type the field name to revise:**\n`{', '.join(questions)}`"
+            self.field_names[t] = {field.lower(): field for field in questions}
+
+    def cooldown_for(self, member):
+        """The cooldown (seconds) for a member, based on their rank."""
+        if member.id == member.guild.owner_id:
+            return self.cooldowns["owner"]
+        if member.guild_permissions.administrator:
+            return self.cooldowns["admin"]
+        if self.verified_role_id and discord.utils.get(member.roles, id=self.verified_role_id):
+            return self.cooldowns["verified"]
+        return self.cooldowns["member"]
+
+
+def merge(base, override):
+    """Per-setting merge. Per-type settings are merged per ticket type."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+class GuildConfigStore:
+    """
+    Holds the settings of every server, indexed by server ID.
+    `defaults` are the built-in settings (used for servers not in the file).
+    """
+    def __init__(self, defaults, path=GUILD_CONFIG_PATH):
+        self.defaults = defaults
+        self.path = path
+        self.stamp = None  # (modification time, size) of the loaded file
+
+        # Swapped in one step on reload, so a lookup never sees half a reload
+        self.snapshot = (GuildConfig(None, defaults, "built-in"), {})
+
+        # Counters
+        self.reloads = 0
+        self.failed_reloads = 0
+
+        self.reload()
+
+    def get(self, guild_id):
+        """The settings of a server (the defaults if it isn't listed)."""
+        default, guilds = self.snapshot
+        return guilds.get(guild_id, default)
+
+    def parse(self, raw):
+        """Checks a whole settings file. Returns (default, {guild_id: GuildConfig})."""
+        if not isinstance(raw, dict):
+            raise ConfigError("the file must contain an object")
+        unknown = set(raw) - {"default", "guilds"}
+        if unknown:
+            raise ConfigError(f"unknown section(s) {', '.join(sorted(unknown))}")
+
+        base = merge(self.defaults, raw.get("default", {}))
+        default = GuildConfig(None, base, "default")
+        guilds = {}
+        for guild_id, settings in raw.get("guilds", {}).items():
+            guild_id = parse_id(guild_id, f"guilds.{guild_id}")
+            guilds[guild_id] = GuildConfig(guild_id, merge(base, settings), f"guilds.{guild_id}")
+        return default, guilds
+
+    def reload(self):
+        """
+        Loads the file if it changed. Returns True if new settings were loaded.
+        A missing file means "built-in settings for everyone".
+        """
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            if self.stamp is not None:
+                self.snapshot = (GuildConfig(None, self.defaults, "built-in"), {})
+                self.stamp = None
+                print(f"⚙️ {self.path} removed, using the built-in settings")
+            return False
+
+        stamp = (info.st_mtime_ns, info.st_size)
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = self.parse(json.load(f))
+        except (OSError, ValueError) as e:  # ConfigError and JSON errors are ValueErrors
+            self.failed_reloads += 1
+            print(f"⚠️ {self.path} not loaded, keeping the old settings: {e}")
+            return False
+
+        self.snapshot = snapshot
+        self.reloads += 1
+        print(f"⚙️ Loaded settings for {len(snapshot[1])} servers from {self.path}")
+        return True
+
+    async def watch(self, interval=GUILD_CONFIG_POLL):
+        """Checks the file for changes forever."""
+        while True:
+            await asyncio.sleep(interval)
+            self.reload()
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "guilds": len(self.snapshot[1]),
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+        }
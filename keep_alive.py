@@ -1,15 +1,116 @@
-from flask import Flask
-from threading import Thread
+import math
+import os
 
-app = Flask('')
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return "I am alive!"
+from metrics import SLOW_LOG, STAGE_SECONDS, TICKET_CREATION_SECONDS, format_labels, render_value
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+# ==========================================
+# 💓 HEALTH & METRICS SERVER
+# ==========================================
+"""
+A small web server that runs inside the bot's own event loop (no extra thread).
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
\ No newline at end of file
+/         -> "I am alive!" (for the external uptime pinger)
+/healthz  -> 200 if the Discord connection is healthy, 503 if not
+/metrics  -> numbers about the bot in the Prometheus text format
+"""
+
+# Render tells us which port to use. 8080 for local testing.
+PORT = int(os.getenv('PORT', 8080))
+
+# Heartbeat latency (seconds) above which the bot counts as unhealthy
+MAX_HEALTHY_LATENCY = float(os.getenv('MAX_HEALTHY_LATENCY', 5))
+
+
+def gateway_health(bot):
+    """Returns (healthy, details) for the Discord gateway connection."""
+    latency = bot.latency
+    connected = bot.is_ready() and not bot.is_closed() and math.isfinite(latency)
+    healthy = connected and latency < MAX_HEALTHY_LATENCY
+    return healthy, {
+        "status": "ok" if healthy else "unhealthy",
+        "gateway_connected": connected,
+        "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        "guilds": len(bot.guilds),
+    }
+
+
+def render_metrics(bot):
+    """Collects the numbers of every subsystem."""
+    healthy, _ = gateway_health(bot)
+    interviews = bot.interviews.stats()
+    outbound = bot.outbound.stats()
+    admission = bot.admission.stats()
+    evidence = bot.evidence.stats()
+
+    lines = []
+    lines += render_value("whitey_up", "1 if the Discord gateway connection is healthy.", int(healthy))
+    latency = bot.latency if math.isfinite(bot.latency) else "NaN"
+    lines += render_value("whitey_gateway_latency_seconds", "Websocket heartbeat latency.", latency)
+    shard_latencies = getattr(bot, "latencies", None)  # Only when sharded
+    if shard_latencies:
+        lines += ["# HELP whitey_shard_latency_seconds Websocket heartbeat latency of each shard.", "# TYPE whitey_shard_latency_seconds gauge"]
+        for shard_id, shard_latency in shard_latencies:
+            value = shard_latency if math.isfinite(shard_latency) else "NaN"
+            lines.append(f"whitey_shard_latency_seconds{format_labels((('shard', shard_id),))} {value}")
+    lines += bot.startup.render()
+    lines += render_value("whitey_open_interviews", "Interviews currently running.", interviews["open_interviews"])
+    lines += render_value("whitey_messages_routed_total", "Messages delivered to an interview.", interviews["routed"], "counter")
+    lines += render_value("whitey_messages_unmatched_total", "Messages that did not belong to any interview.", interviews["unmatched"], "counter")
+    lines += render_value("whitey_messages_dropped_total", "Messages dropped because an interview queue was full.", interviews["dropped"], "counter")
+    lines += render_value("whitey_cooldowns", "Users currently on cooldown.", len(bot.cooldowns))
+    lines += render_value("whitey_outbound_queue_depth", "Discord calls waiting in the send scheduler.", outbound["queue_depth"])
+    lines += render_value("whitey_outbound_in_flight", "Discord calls running right now.", outbound["in_flight"])
+    lines += render_value("whitey_outbound_waiting_for_slot", "Calls waiting for a free in-flight slot.", outbound["waiting_for_slot"])
+    lines += render_value("whitey_outbound_wait_seconds_max", "Longest time a call waited in the send scheduler.", outbound["max_wait"])
+    lines += render_value("whitey_outbound_retries_total", "Calls retried after a rate limit.", outbound["retries"], "counter")
+    lines += render_value("whitey_evidence_bytes_relayed_total", "Attachment bytes copied to log channels.", bot.relay.bytes_relayed, "counter")
+    lines += render_value("whitey_evidence_cache_bytes", "Evidence bytes kept in the local cache.", evidence["stored_bytes"])
+    lines += render_value("whitey_evidence_cache_hit_ratio", "Share of evidence downloads and uploads that were skipped.", evidence["hit_ratio"])
+    lines += render_value("whitey_evidence_bytes_saved_total", "Evidence bytes not downloaded or uploaded thanks to the cache.", evidence["bytes_saved"], "counter")
+    lines += render_value("whitey_admission_open_tickets", "Tickets currently holding an admission slot.", admission["open_tickets"])
+    lines += render_value("whitey_admission_queue_depth", "Users waiting in line for a ticket.", admission["queue_depth"])
+    lines += render_value("whitey_admission_queued_total", "Ticket requests that had to wait in line.", admission["queued"], "counter")
+    lines += render_value("whitey_admission_rejected_total", "Ticket requests turned away (line full or waited too long).", admission["rejected"], "counter")
+    lines += render_value("whitey_config_guilds", "Servers with their own settings in guilds.json.", bot.guild_config.stats()["guilds"])
+    lines += render_value("whitey_config_reloads_failed_total", "guilds.json changes that were refused because the file was invalid.", bot.guild_config.failed_reloads, "counter")
+    lines += render_value("whitey_archive_searches_total", "!search queries run.", bot.archive.searches, "counter")
+    lines += render_value("whitey_archive_search_seconds_total", "Time spent running !search queries.", bot.archive.search_seconds, "counter")
+    lines += render_value("whitey_duplicates_indexed", "Recent reports the duplicate detector compares against.", len(bot.duplicates))
+    lines += render_value("whitey_duplicates_total", "Reports grouped under an earlier, similar report.", bot.duplicates.duplicates, "counter")
+    lines += render_value("whitey_roster_members", "Alliance members loaded from the roster export.", len(bot.roster))
+    lines += render_value("whitey_roster_misses_total", "Answers that were not on the roster.", bot.roster.misses, "counter")
+    lines += render_value("whitey_pool_spare_channels", "Ready-made ticket channels waiting in the pool.", bot.pool.stats()["spare_channels"])
+    lines += render_value("whitey_reaper_swept_total", "Stale ticket channels cleaned up.", bot.reaper.total_swept, "counter")
+    lines += render_value("whitey_slow_log_dropped_total", "Slow-stage log entries dropped because the log queue was full.", SLOW_LOG.dropped, "counter")
+    lines += TICKET_CREATION_SECONDS.render()
+    lines += STAGE_SECONDS.render()
+    return "\n".join(lines) + "\n"
+
+
+async def keep_alive(bot, port=PORT):
+    """
+    Starts the web server on the bot's event loop. Returns the runner
+    (call `await runner.cleanup()` to stop it).
+    """
+    async def home(request):
+        return web.Response(text="I am alive!")
+
+    async def healthz(request):
+        healthy, details = gateway_health(bot)
+        return web.json_response(details, status=200 if healthy else 503)
+
+    async def metrics(request):
+        return web.Response(text=render_metrics(bot), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/metrics', metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host='0.0.0.0', port=port)
+    await site.start()
+    return runner
@@ -0,0 +1,243 @@
+import asyncio
+import bisect
+import json
+import os
+import sys
+import time
+
+# ==========================================
+# 📈 METRICS
+# ==========================================
+"""
+Tiny in-memory metrics, printed in the Prometheus text format on /metrics.
+No extra library needed.
+
+Also times each stage of the ticket pipeline (see `stage()`), and writes
+unusually slow stages to a log without ever blocking the bot.
+"""
+
+# Turn stage timing off with TRACE_STAGES=false (the hooks then do nothing)
+TRACE_STAGES = os.getenv('TRACE_STAGES', 'true').lower() in ('1', 'true', 'yes')
+
+# Stages slower than this (seconds) are written to the slow log
+SLOW_STAGE_SECONDS = float(os.getenv('SLOW_STAGE_SECONDS', 2))
+
+# Where the slow log goes (one JSON object per line). Empty = the console.
+SLOW_LOG_PATH = os.getenv('SLOW_LOG_PATH', '')
+
+# Upper limits (in seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stages range from a few milliseconds (sends) to minutes (waiting for the user)
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def format_labels(labels):
+    """{"ticket_type": "Bug"} -> '{ticket_type="Bug"}'"""
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+class Histogram:
+    """
+    Counts observations (like durations) into buckets, per set of labels.
+    """
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}  # labels: [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1  # Bigger values only show up in the "+Inf" bucket
+        series[-2] += value
+        series[-1] += 1
+
+    def quantile(self, key, q):
+        """
+        Estimates a percentile (q between 0 and 1) for one series from its buckets,
+        the same way Prometheus' histogram_quantile() does.
+        """
+        series = self.series[key]
+        target = q * series[-1]
+        running = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, series):
+            if count and running + count >= target:
+                return lower + (bound - lower) * (target - running) / count
+            running += count
+            lower = bound
+        return self.buckets[-1]
+
+    def breakdown(self):
+        """Returns {labels: (count, mean, p50, p99)} for every series."""
+        return {
+            key: (series[-1], series[-2] / series[-1], self.quantile(key, 0.5), self.quantile(key, 0.99))
+            for key, series in self.series.items() if series[-1]
+        }
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in self.series.items():
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', bound),))} {running}")
+            lines.append(f"{self.name}_bucket{format_labels(key + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{format_labels(key)} {series[-1]}")
+        return lines
+
+
+def render_value(name, description, value, kind="gauge"):
+    """A single gauge or counter in the Prometheus text format."""
+    return [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+class StartupTimer:
+    """
+    Remembers how long each startup step took to be reached, counted from
+    `started` (the first line of bot.py): import, setup, login, ready,
+    first_interaction.
+    """
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = {}  # step: seconds since start (in the order they happened)
+
+    def mark(self, step):
+        """Records a step the first time it happens. Returns True if it was new."""
+        if step in self.marks:
+            return False
+        self.marks[step] = time.perf_counter() - self.started
+        return True
+
+    def report(self):
+        """'import 0.31s | setup 0.02s | login 0.45s | ...' (time of each step since the previous one)"""
+        parts = []
+        previous = 0.0
+        for step, seconds in self.marks.items():
+            parts.append(f"{step} {seconds - previous:.2f}s")
+            previous = seconds
+        return " | ".join(parts) + f" | total {previous:.2f}s"
+
+    def render(self):
+        """The steps in the Prometheus text format."""
+        name = "whitey_startup_seconds"
+        lines = [f"# HELP {name} Seconds from start until each startup step was reached.", f"# TYPE {name} gauge"]
+        for step, seconds in self.marks.items():
+            lines.append(f"{name}{format_labels((('step', step),))} {seconds}")
+        return lines
+
+
+# Time from button click until the ticket channel is ready
+TICKET_CREATION_SECONDS = Histogram("whitey_ticket_creation_seconds", "Time from button click until the ticket channel is ready.")
+
+# Time spent in each stage of the ticket pipeline
+STAGE_SECONDS = Histogram("whitey_stage_seconds", "Time spent in each stage of the ticket pipeline.", STAGE_BUCKETS)
+
+
+class SlowStageLog:
+    """
+    Collects slow stages in a queue; a background task writes them out.
+    `emit()` never waits: if the queue is full the entry is dropped (and counted).
+    """
+    def __init__(self, path=SLOW_LOG_PATH, max_pending=1000):
+        self.path = path
+        self.queue = None
+        self.max_pending = max_pending
+        self.writer = None
+        self.written = 0
+        self.dropped = 0
+
+    def emit(self, entry):
+        if self.writer is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return  # No event loop (e.g. in a script): nothing to write with
+            self.queue = asyncio.Queue(maxsize=self.max_pending)
+            self.writer = asyncio.create_task(self._write_forever())
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _write(self, lines):
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        else:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+
+    async def _write_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            entries = [await self.queue.get()]
+            while not self.queue.empty():
+                entries.append(self.queue.get_nowait())
+            lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+            # File/console writes run in a worker thread so they never block the bot
+            await loop.run_in_executor(None, self._write, lines)
+            self.written += len(entries)
+
+
+SLOW_LOG = SlowStageLog()
+
+
+def record_stage(name, ticket_type, seconds, log_slow=True):
+    """Records how long a stage took."""
+    if not TRACE_STAGES:
+        return
+    STAGE_SECONDS.observe(seconds, stage=name, ticket_type=ticket_type)
+    if log_slow and seconds > SLOW_STAGE_SECONDS:
+        SLOW_LOG.emit({"event": "slow_stage", "stage": name, "ticket_type": ticket_type, "seconds": round(seconds, 3), "at": time.time()})
+
+
+class _StageTimer:
+    __slots__ = ("name", "ticket_type", "log_slow", "started")
+
+    def __init__(self, name, ticket_type, log_slow):
+        self.name = name
+        self.ticket_type = ticket_type
+        self.log_slow = log_slow
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, self.ticket_type, time.perf_counter() - self.started, self.log_slow)
+        return False
+
+
+class _NoTimer:
+    """Used when TRACE_STAGES is off: does nothing at all."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def stage(name, ticket_type, log_slow=True):
+    """
+    Times a stage of the ticket pipeline:
+        with stage("intro", ticket_type):
+            await channel.send(...)
+    Set log_slow=False for stages that wait on the user (they are always "slow").
+    """
+    if not TRACE_STAGES:
+        return _NO_TIMER
+    return _StageTimer(name, ticket_type, log_slow)
@@ -0,0 +1,152 @@
+import asyncio
+import collections
+import os
+import secrets
+
+import discord
+
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_CONTROL
+
+# ==========================================
+# 🏊 TICKET CHANNEL POOL
+# ==========================================
+"""
+Keeps a few hidden, ready-made ticket channels in every server that uses tickets.
+
+When someone clicks a button we rename one of them and give the user access,
+which is much faster than creating a brand new channel while they wait.
+The pool is topped up again in the background.
+
+At startup only servers that already have the "Tickets" category get their
+spare channels. Other servers get nothing until their first ticket, so
+adding the bot to a server doesn't create channels there on its own.
+"""
+
+# Name of the category that holds all ticket channels
+CATEGORY_NAME = "Tickets"
+
+# How many spare channels to keep ready per server
+POOL_SIZE = int(os.getenv('TICKET_POOL_SIZE', 3))
+
+# Spare channels are named like "pool-3fa2c1"
+POOL_PREFIX = "pool-"
+
+
+class TicketChannelPool:
+    """
+    Per-server pool of spare ticket channels.
+    """
+    def __init__(self, outbound, size=POOL_SIZE):
+        self.outbound = outbound
+        self.size = size
+        self.category_ids = {}  # guild_id: "Tickets" category id
+        self.spares = {}        # guild_id: deque of spare channel ids
+        self.locks = {}         # guild_id: lock so only one click creates the category
+        self.refills = {}       # guild_id: running refill task
+        self.claiming = set()   # channel ids handed out but not yet given back with `done`
+
+        # Counters
+        self.hits = 0    # Tickets that got a ready-made channel
+        self.misses = 0  # Tickets that had to wait for a new channel
+
+    async def get_category(self, guild):
+        """Finds (or creates) the "Tickets" category. Looked up once, then cached."""
+        category = guild.get_channel(self.category_ids.get(guild.id, 0))
+        if category is not None:
+            return category
+
+        lock = self.locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            # Another click may have created it while we were waiting
+            category = guild.get_channel(self.category_ids.get(guild.id, 0))
+            if category is not None:
+                return category
+
+            category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
+            if not category:
+                category = await self.outbound.create_category(guild, CATEGORY_NAME)
+            self.category_ids[guild.id] = category.id
+
+            # Re-use spare channels left over from before a restart
+            self.spares[guild.id] = collections.deque(
+                c.id for c in category.text_channels if c.name.startswith(POOL_PREFIX)
+            )
+            return category
+
+    async def claim(self, guild, name, overwrites):
+        """
+        Returns a ticket channel called `name` with the given permissions.
+        Uses a spare channel if one is ready, otherwise creates a new one.
+        Call `done(channel)` when the ticket is over.
+        """
+        category = await self.get_category(guild)
+        spares = self.spares[guild.id]
+
+        while spares:
+            channel = guild.get_channel(spares.popleft())
+            if channel is None:
+                continue  # Someone deleted it by hand
+            # Marked before the rename: the renamed spare keeps its old creation date and
+            # has no messages yet, so the reaper would otherwise take it for a stale ticket
+            self.claiming.add(channel.id)
+            try:
+                edited = await self.outbound.submit(
+                    ("channel", channel.id),
+                    lambda: channel.edit(name=name, overwrites=overwrites),
+                    PRIORITY_CONTROL
+                )
+            except discord.HTTPException:
+                self.claiming.discard(channel.id)
+                continue
+            self.hits += 1
+            self.refill(guild)
+            return edited or channel
+
+        self.misses += 1
+        channel = await self.outbound.create_text_channel(guild, name, category=category, overwrites=overwrites)
+        self.claiming.add(channel.id)
+        self.refill(guild)
+        return channel
+
+    def done(self, channel):
+        """The ticket in a claimed channel is over (the reaper may look at it again)."""
+        self.claiming.discard(channel.id)
+
+    def warm(self, guild):
+        """Fills the pool at startup, but only if this server has used tickets before."""
+        if discord.utils.get(guild.categories, name=CATEGORY_NAME) is not None:
+            self.refill(guild)
+
+    def refill(self, guild):
+        """Tops up the pool in the background (does nothing if already running)."""
+        task = self.refills.get(guild.id)
+        if task is None or task.done():
+            self.refills[guild.id] = asyncio.create_task(self._refill(guild))
+
+    async def _refill(self, guild):
+        try:
+            category = await self.get_category(guild)
+            spares = self.spares[guild.id]
+
+            # Hidden from everyone except the bot until claimed
+            overwrites = {
+                guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                guild.me: discord.PermissionOverwrite(read_messages=True)
+            }
+            while len(spares) < self.size:
+                name = f"{POOL_PREFIX}{secrets.token_hex(3)}"
+                channel = await self.outbound.create_text_channel(
+                    guild, name, priority=PRIORITY_BACKGROUND, category=category, overwrites=overwrites
+                )
+                spares.append(channel.id)
+        except discord.HTTPException as e:
+            print(f"⚠️ Could not refill the ticket pool in {guild.name}: {e}")
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "spare_channels": sum(len(s) for s in self.spares.values()),
+            "claimed_channels": len(self.claiming),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
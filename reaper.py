@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+
+import discord
+
+from pool import CATEGORY_NAME
+from scheduler import PRIORITY_BACKGROUND
+
+# ==========================================
+# 🧹 STALE TICKET REAPER
+# ==========================================
+"""
+Cleans up ticket channels that were left behind (crashes, errors, timeouts).
+
+Runs once at startup and then every few minutes. A ticket channel is swept
+when nobody is being interviewed in it and it has been quiet for a while.
+Only channels the bot made are looked at: the ones inside its "Tickets"
+category and the ones with a saved interview. A normal channel called
+#bug-reports is never touched.
+Channels are deleted (or moved to an archive category) a few at a time, so
+the cleanup never floods Discord with requests.
+"""
+
+# Channel names that belong to tickets
+TICKET_PREFIXES = ("bug-", "suggestion-", "complaint-")
+
+# How often to look for stale tickets (seconds)
+REAPER_INTERVAL = int(os.getenv('REAPER_INTERVAL', 15 * 60))
+
+# A ticket without a running interview is stale after this much silence (seconds)
+REAPER_GRACE = int(os.getenv('REAPER_GRACE', 10 * 60))
+
+# Even tickets with a running interview are stale after this much silence (seconds)
+REAPER_MAX_IDLE = int(os.getenv('REAPER_MAX_IDLE', 24 * 60 * 60))
+
+# "delete" removes stale tickets, "archive" moves them to the archive category
+REAPER_ACTION = os.getenv('REAPER_ACTION', 'delete')
+ARCHIVE_CATEGORY = "Ticket Archive"
+
+# How many channels are cleaned up at the same time
+REAPER_CONCURRENCY = int(os.getenv('REAPER_CONCURRENCY', 3))
+
+
+def last_activity(channel):
+    """When something last happened in the channel (last message, or creation)."""
+    if channel.last_message_id:
+        return discord.utils.snowflake_time(channel.last_message_id)
+    return channel.created_at
+
+
+class TicketReaper:
+    """
+    Finds and removes stale ticket channels.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.archive_ids = {}  # guild_id: archive category id
+        self.archive_lock = asyncio.Lock()  # So parallel sweeps create only one archive
+
+        # Counters
+        self.sweeps = 0
+        self.total_swept = 0
+        self.last_swept = 0
+        self.last_duration = 0.0
+
+    def ticket_channels(self, guild, saved):
+        """
+        The channels of a server that may be tickets: the ticket channels in the
+        "Tickets" category, plus channels with a saved interview.
+        """
+        channels = {}
+        # Looked up by name when the pool hasn't cached it yet (e.g. the sweep at startup)
+        category = guild.get_channel(self.bot.pool.category_ids.get(guild.id, 0))
+        if category is None:
+            category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
+        if category is not None:
+            channels.update((c.id, c) for c in category.text_channels)
+        for channel_id in saved:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                channels[channel_id] = channel
+        return channels.values()
+
+    def is_stale(self, channel, protected, now):
+        """Decides whether a channel should be swept."""
+        if not channel.name.startswith(TICKET_PREFIXES):
+            return False
+        if channel.category and channel.category.name == ARCHIVE_CATEGORY:
+            return False
+
+        idle = (now - last_activity(channel)).total_seconds()
+        if channel.id in protected or self.bot.interviews.is_active(channel.id):
+            return idle > REAPER_MAX_IDLE
+        return idle > REAPER_GRACE
+
+    async def get_archive(self, guild):
+        """Finds (or creates) the hidden archive category."""
+        async with self.archive_lock:
+            category = guild.get_channel(self.archive_ids.get(guild.id, 0))
+            if category is None:
+                category = discord.utils.get(guild.categories, name=ARCHIVE_CATEGORY)
+            if category is None:
+                overwrites = {
+                    guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                    guild.me: discord.PermissionOverwrite(read_messages=True)
+                }
+                category = await self.bot.outbound.create_category(guild, ARCHIVE_CATEGORY, priority=PRIORITY_BACKGROUND, overwrites=overwrites)
+            self.archive_ids[guild.id] = category.id
+            return category
+
+    async def reap(self, channel, limit):
+        """Deletes or archives one channel. Returns True if it worked."""
+        async with limit:
+            try:
+                if REAPER_ACTION == "archive":
+                    archive = await self.get_archive(channel.guild)
+                    await self.bot.outbound.submit(
+                        ("channel", channel.id),
+                        lambda: channel.edit(category=archive, sync_permissions=True),
+                        PRIORITY_BACKGROUND
+                    )
+                else:
+                    await self.bot.outbound.delete(channel, priority=PRIORITY_BACKGROUND)
+                self.bot.checkpoints.finish(channel.id)
+                return True
+            except discord.NotFound:
+                return False  # Already gone
+            except discord.HTTPException as e:
+                print(f"⚠️ Could not sweep #{channel.name}: {e}")
+                return False
+
+    async def sweep(self):
+        """Looks through every server once. Returns how many channels were swept."""
+        started = time.perf_counter()
+        now = discord.utils.utcnow()
+
+        # Tickets with a live or saved interview (or just handed out by the pool) get a lot more time
+        saved = self.bot.checkpoints.channel_ids()
+        protected = saved | self.bot.pool.claiming
+
+        stale = [
+            channel
+            for guild in self.bot.guilds
+            for channel in self.ticket_channels(guild, saved)
+            if self.is_stale(channel, protected, now)
+        ]
+
+        limit = asyncio.Semaphore(REAPER_CONCURRENCY)
+        results = await asyncio.gather(*(self.reap(channel, limit) for channel in stale))
+
+        self.sweeps += 1
+        self.last_swept = sum(results)
+        self.total_swept += self.last_swept
+        self.last_duration = time.perf_counter() - started
+        if stale:
+            print(f"🧹 Swept {self.last_swept}/{len(stale)} stale tickets in {self.last_duration:.2f}s")
+        return self.last_swept
+
+    async def run(self):
+        """Sweeps at startup and then every REAPER_INTERVAL seconds."""
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"⚠️ Ticket sweep failed: {e}")
+            await asyncio.sleep(REAPER_INTERVAL)
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "sweeps": self.sweeps,
+            "total_swept": self.total_swept,
+            "last_swept": self.last_swept,
+            "last_duration": self.last_duration,
+        }
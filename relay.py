@@ -0,0 +1,219 @@
+import asyncio
+import contextlib
+import hashlib
+import os
+import tempfile
+import time
+
+import aiohttp
+import discord
+
+# ==========================================
+# 📸 EVIDENCE RELAY
+# ==========================================
+"""
+Copies ticket attachments (screenshots/videos) into the log channel.
+
+Files are streamed in small chunks into a temporary file that only stays in
+memory while it is small, then uploaded from there. Byte budgets stop a few
+big videos from filling up the memory of the free-tier server.
+
+With an evidence cache (see evidence.py), files seen before are read from
+disk instead of downloaded, and files already posted in the log channel
+are linked instead of uploaded again.
+"""
+
+# Files bigger than this are moved from memory to a temp file on disk
+RELAY_MEMORY_THRESHOLD = int(os.getenv('RELAY_MEMORY_THRESHOLD', 2 * 1024 * 1024))
+
+# Most bytes a single ticket may relay (extra files are skipped)
+RELAY_TICKET_BUDGET = int(os.getenv('RELAY_TICKET_BUDGET', 25 * 1024 * 1024))
+
+# Most bytes all tickets together may have in flight at the same time
+RELAY_GLOBAL_BUDGET = int(os.getenv('RELAY_GLOBAL_BUDGET', 100 * 1024 * 1024))
+
+# Discord allows at most 10 files per message
+MAX_FILES_PER_MESSAGE = 10
+
+CHUNK_SIZE = 64 * 1024
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+def is_image(filename):
+    """Returns True if the file can be shown inside an embed."""
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class EvidenceBundle:
+    """
+    What `EvidenceRelay.open_files` hands out:
+    - files: discord.File objects to upload
+    - reused: (filename, link) for files already posted in the channel
+    """
+    def __init__(self):
+        self.files = []
+        self.hashes = []  # Content hash of each file in `files`
+        self.reused = []
+
+
+class EvidenceRelay:
+    """
+    Streams attachments into temp files and hands them out as discord.File objects.
+    Works with anything that has `.url`, `.filename` and `.size` (like discord.Attachment).
+    """
+    def __init__(self, memory_threshold=RELAY_MEMORY_THRESHOLD, ticket_budget=RELAY_TICKET_BUDGET, global_budget=RELAY_GLOBAL_BUDGET, cache=None):
+        self.memory_threshold = memory_threshold
+        self.cache = cache
+        self.ticket_budget = ticket_budget
+        self.global_budget = global_budget
+
+        self.in_flight = 0  # Bytes currently held by all relays
+        self.condition = asyncio.Condition()
+        self.session = None
+
+        # Counters
+        self.bytes_relayed = 0
+        self.files_relayed = 0
+        self.files_skipped = 0
+        self.relays = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def pick(self, attachments):
+        """Chooses the attachments that fit in the per-ticket budget."""
+        chosen = []
+        total = 0
+        for attachment in attachments:
+            if len(chosen) >= MAX_FILES_PER_MESSAGE or total + attachment.size > self.ticket_budget:
+                self.files_skipped += 1
+                continue
+            chosen.append(attachment)
+            total += attachment.size
+        return chosen, total
+
+    async def reserve(self, size):
+        """Waits until the global budget has room for `size` bytes."""
+        async with self.condition:
+            # A single file bigger than the whole budget may still go when nothing else is running
+            await self.condition.wait_for(lambda: self.in_flight + size <= self.global_budget or self.in_flight == 0)
+            self.in_flight += size
+
+    async def release(self, size):
+        async with self.condition:
+            self.in_flight -= size
+            self.condition.notify_all()
+
+    async def download(self, attachment):
+        """Streams one attachment into a temp file. Returns (file rewound, SHA-256 hex of the content)."""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+
+        spool = tempfile.SpooledTemporaryFile(max_size=self.memory_threshold)
+        digest = hashlib.sha256()
+        try:
+            async with self.session.get(attachment.url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    spool.write(chunk)
+                    digest.update(chunk)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool, digest.hexdigest()
+
+    async def fetch(self, attachment, channel_id):
+        """
+        Gets one attachment, from the cache when possible.
+        Returns (open file or None, hash, link to an earlier upload in `channel_id` or None, downloaded?).
+        """
+        cache = self.cache
+        digest = cache.known(attachment) if cache else None
+        if digest is not None:
+            link = cache.uploaded(digest, channel_id) if channel_id else None
+            if link:
+                return None, digest, link, False
+            fp = cache.open(digest)
+            if fp is not None:
+                return fp, digest, None, False
+
+        spool, digest = await self.download(attachment)
+        if cache:
+            cache.remember(attachment, digest)
+            link = cache.uploaded(digest, channel_id) if channel_id else None
+            if link:
+                spool.close()
+                return None, digest, link, True
+            await cache.store(digest, spool, attachment.size)
+        return spool, digest, None, True
+
+    @contextlib.asynccontextmanager
+    async def open_files(self, attachments, channel_id=None):
+        """
+        Usage:
+            async with relay.open_files(attachments, log_channel.id) as evidence:
+                message = await log_channel.send(embed=embed, files=evidence.files)
+                relay.uploaded(evidence, log_channel.id, message)
+        Files that fail to download are skipped. Temp files are closed afterwards.
+        Files already posted in `channel_id` end up in `evidence.reused` instead.
+        """
+        started = time.perf_counter()
+        chosen, total = self.pick(attachments)
+        await self.reserve(total)
+
+        handles = []
+        bundle = EvidenceBundle()
+        try:
+            results = await asyncio.gather(*(self.fetch(a, channel_id) for a in chosen), return_exceptions=True)
+            for attachment, result in zip(chosen, results):
+                if isinstance(result, Exception):
+                    print(f"⚠️ Could not download {attachment.filename}: {result}")
+                    self.files_skipped += 1
+                    continue
+                fp, digest, link, downloaded = result
+                if fp is not None:
+                    handles.append(fp)
+                # The same file twice in one report is only uploaded once
+                upload = link is None and digest not in bundle.hashes
+                if self.cache:
+                    self.cache.count(attachment.size, downloaded, upload)
+                if link:
+                    bundle.reused.append((attachment.filename, link))
+                elif upload:
+                    bundle.files.append(discord.File(fp, filename=attachment.filename))
+                    bundle.hashes.append(digest)
+
+            yield bundle
+
+            # Only count what was actually delivered
+            self.files_relayed += len(bundle.files)
+            self.bytes_relayed += sum(f.fp.seek(0, os.SEEK_END) for f in bundle.files)
+            latency = time.perf_counter() - started
+            self.relays += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        finally:
+            for fp in handles:
+                fp.close()
+            await self.release(total)
+
+    def uploaded(self, bundle, channel_id, message):
+        """Remembers that `message` in `channel_id` has the files of the bundle."""
+        if self.cache and bundle.hashes and message is not None:
+            self.cache.record_upload(bundle.hashes, channel_id, message.jump_url)
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "bytes_relayed": self.bytes_relayed,
+            "files_relayed": self.files_relayed,
+            "files_skipped": self.files_skipped,
+            "bytes_in_flight": self.in_flight,
+            "avg_latency": self.total_latency / self.relays if self.relays else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
@@ -0,0 +1,313 @@
+import asyncio
+import collections
+import csv
+import json
+import os
+import time
+import unicodedata
+
+# ==========================================
+# 📇 ALLIANCE ROSTER
+# ==========================================
+"""
+Checks Player IDs and in-game names against an export of the alliance
+member list, so typos are caught in the ticket instead of by a moderator.
+
+The export is a CSV file with a header row, e.g.
+
+    Player ID,Name
+    12345678,Frosty
+
+or a JSON file: a list of {"Player ID": ..., "Name": ...} objects, or
+{"12345678": "Frosty", ...}. Common column names ("id", "fid",
+"nickname", "In-Game Name"...) are recognised.
+
+- IDs are kept in a dictionary. A wrong ID is checked against every ID
+  one typo away (a digit changed, missing, extra or swapped), which is a
+  few hundred dictionary lookups.
+- Names are split into 3-letter pieces (trigrams). A misspelled name is
+  compared only with the names that share pieces with it.
+
+The file is checked for changes every ROSTER_POLL seconds. Only the rows
+that were added, removed or renamed are updated in the indexes. Without
+the file the roster is off and every answer is accepted like before.
+"""
+
+# Where the export is. Can be changed with an Environment Variable.
+ROSTER_PATH = os.getenv('ROSTER_FILE', 'roster.csv')
+
+# How often to check the file for changes (seconds)
+ROSTER_POLL = float(os.getenv('ROSTER_POLL', 30))
+
+# Answers checked against the roster
+ID_FIELDS = ("Player ID",)
+NAME_FIELDS = ("In-Game Name", "Offender Name")
+
+# Column names recognised in the export (compared without case, spaces, _ and -)
+ID_COLUMNS = ("playerid", "id", "fid", "gameid", "uid")
+NAME_COLUMNS = ("ingamename", "name", "nickname", "playername", "username")
+
+# How alike (0 to 1) a name must be to be suggested
+MIN_NAME_SCORE = 0.4
+
+DIGITS = "0123456789"
+
+
+class RosterError(ValueError):
+    """The export could not be read."""
+
+
+def normalize(name):
+    """Case, accents and spacing don't matter when comparing names."""
+    name = unicodedata.normalize("NFKD", name.casefold())
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.split())
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def one_typo_away(player_id):
+    """Every ID that differs by one changed, missing, extra or swapped digit."""
+    for i in range(len(player_id)):
+        for d in DIGITS:
+            if d != player_id[i]:
+                yield player_id[:i] + d + player_id[i + 1:]
+        yield player_id[:i] + player_id[i + 1:]
+        if i + 1 < len(player_id) and player_id[i] != player_id[i + 1]:
+            yield player_id[:i] + player_id[i + 1] + player_id[i] + player_id[i + 2:]
+    for i in range(len(player_id) + 1):
+        for d in DIGITS:
+            yield player_id[:i] + d + player_id[i:]
+
+
+def column(header, choices):
+    """Finds the first header that matches one of the known column names."""
+    keys = {"".join(c for c in h.casefold() if c.isalnum()): h for h in header if h}
+    return next((keys[c] for c in choices if c in keys), None)
+
+
+def parse_rows(rows, where):
+    """[{column: value}] -> {player id: name}"""
+    rows = list(rows)
+    if not rows:
+        return {}
+    id_column = column(rows[0].keys(), ID_COLUMNS)
+    name_column = column(rows[0].keys(), NAME_COLUMNS)
+    if id_column is None or name_column is None:
+        raise RosterError(f"{where}: needs a Player ID and a name column, found {list(rows[0].keys())}")
+
+    members = {}
+    for line, row in enumerate(rows, start=2):
+        player_id = str(row.get(id_column) or "").strip()
+        name = str(row.get(name_column) or "").strip()
+        if not player_id and not name:
+            continue  # Blank line
+        if not player_id.isdigit():
+            raise RosterError(f"{where} row {line}: Player ID {player_id!r} is not a number")
+        members[player_id] = name
+    return members
+
+
+def read_export(path):
+    """Reads a CSV or JSON export. Returns {player id: name}."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            if isinstance(data, dict):
+                return parse_rows(({"id": k, "name": v} for k, v in data.items()), path)
+            if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+                return parse_rows(data, path)
+            raise RosterError(f"{path}: expected a list of members or an {{id: name}} object")
+        return parse_rows(csv.DictReader(f), path)
+
+
+class Roster:
+    """
+    In-memory index of the alliance members: by ID, by name, and by name trigrams.
+    """
+    def __init__(self, path=ROSTER_PATH):
+        self.path = path
+        self.stamp = None                              # (mtime, size) of the loaded file
+
+        self.by_id = {}                                # player id: name
+        self.by_name = {}                              # normalized name: {player ids}
+        self.grams = collections.defaultdict(set)      # trigram: {normalized names}
+        self.gram_counts = {}                          # normalized name: number of trigrams
+
+        # Counters
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.checks = 0
+        self.misses = 0
+        self.check_seconds = 0.0
+
+    # --- Index updates ---
+
+    def _add(self, player_id, name):
+        self.by_id[player_id] = name
+        key = normalize(name)
+        if not key:
+            return
+        ids = self.by_name.setdefault(key, set())
+        ids.add(player_id)
+        if len(ids) == 1:
+            grams = trigrams(key)
+            self.gram_counts[key] = len(grams)
+            for gram in grams:
+                self.grams[gram].add(key)
+
+    def _remove(self, player_id):
+        key = normalize(self.by_id.pop(player_id))
+        ids = self.by_name.get(key)
+        if ids is None:
+            return
+        ids.discard(player_id)
+        if not ids:
+            del self.by_name[key]
+            del self.gram_counts[key]
+            for gram in trigrams(key):
+                names = self.grams[gram]
+                names.discard(key)
+                if not names:
+                    del self.grams[gram]
+
+    def update(self, members):
+        """
+        Brings the index in line with {player id: name}, touching only what changed.
+        Returns (added, removed, renamed).
+        """
+        removed = [i for i in self.by_id if i not in members]
+        renamed = [i for i, name in members.items() if i in self.by_id and self.by_id[i] != name]
+        added = [i for i in members if i not in self.by_id]
+        for player_id in removed + renamed:
+            self._remove(player_id)
+        for player_id in renamed + added:
+            self._add(player_id, members[player_id])
+        return len(added), len(removed), len(renamed)
+
+    def reload(self):
+        """
+        Loads the export if it changed. Returns True if the roster changed.
+        A missing file turns the roster off.
+        """
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            if self.stamp is not None:
+                self.update({})
+                self.stamp = None
+                print(f"📇 {self.path} removed, the roster is off")
+            return False
+
+        stamp = (info.st_mtime_ns, info.st_size)
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+
+        try:
+            members = read_export(self.path)
+        except (OSError, ValueError, csv.Error) as e:  # RosterError and JSON errors are ValueErrors
+            self.failed_reloads += 1
+            print(f"⚠️ {self.path} not loaded, keeping the old roster: {e}")
+            return False
+
+        added, removed, renamed = self.update(members)
+        self.reloads += 1
+        print(f"📇 Roster: {len(self.by_id)} members from {self.path} (+{added} -{removed} ~{renamed})")
+        return True
+
+    async def watch(self, interval=ROSTER_POLL, load_now=False):
+        """Checks the file for changes forever (`load_now`: load it first, without waiting)."""
+        if load_now:
+            self.reload()
+        while True:
+            await asyncio.sleep(interval)
+            self.reload()
+
+    # --- Lookups ---
+
+    def closest_ids(self, player_id, limit=3):
+        """Roster IDs one typo away from `player_id`."""
+        found = []
+        for candidate in one_typo_away(player_id):
+            if candidate in self.by_id and candidate not in found:
+                found.append(candidate)
+                if len(found) == limit:
+                    break
+        return found
+
+    def closest_names(self, name, limit=3):
+        """[(score, roster name)] for the names most like `name`, best first."""
+        key = normalize(name)
+        grams = trigrams(key)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self.grams.get(gram, ()))
+        # Dice coefficient: 2 * shared / (trigrams of both). Names sharing too few can't reach it.
+        needed = MIN_NAME_SCORE * len(grams) / 2
+        counts = self.gram_counts
+        scored = []
+        for candidate, count in shared.items():
+            if count >= needed:
+                score = 2 * count / (len(grams) + counts[candidate])
+                if score >= MIN_NAME_SCORE:
+                    scored.append((score, candidate))
+        scored.sort(reverse=True)
+        return [(score, self.by_id[min(self.by_name[c])]) for score, c in scored[:limit]]
+
+    def check(self, field, value):
+        """
+        Checks one answer. Returns a hint for the user ("not on the roster,
+        did you mean ...?"), or None if it is fine or the field isn't checked.
+        """
+        if not self.by_id or (field not in ID_FIELDS and field not in NAME_FIELDS):
+            return None
+        started = time.perf_counter()
+        value = value.strip()
+        hint = None
+
+        if field in ID_FIELDS:
+            if value not in self.by_id:
+                close = [f"`{i}` ({self.by_id[i]})" for i in self.closest_ids(value)]
+                hint = f"⚠️ **Player ID {value} is not on the alliance roster.**"
+                if close:
+                    hint += f" Did you mean {' or '.join(close)}?"
+        elif normalize(value) not in self.by_name:
+            close = [f"**{name}**" for _, name in self.closest_names(value)]
+            hint = f"⚠️ **{value} is not on the alliance roster.**"
+            if close:
+                hint += f" Did you mean {' or '.join(close)}?"
+
+        self.checks += 1
+        self.misses += hint is not None
+        self.check_seconds += time.perf_counter() - started
+        return hint
+
+    def note(self, field, value):
+        """A short note for the log embed next to a checked answer ("" if nothing to say)."""
+        if not self.by_id:
+            return ""
+        value = value.strip()
+        if field in ID_FIELDS:
+            name = self.by_id.get(value)
+            return f" ✅ {name}" if name else " ⚠️ *not on the roster*"
+        if field in NAME_FIELDS and normalize(value) not in self.by_name:
+            return " ⚠️ *not on the roster*"
+        return ""
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "members": len(self.by_id),
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "checks": self.checks,
+            "misses": self.misses,
+            "avg_check_seconds": self.check_seconds / self.checks if self.checks else 0.0,
+        }
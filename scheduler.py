@@ -0,0 +1,194 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+import discord
+
+# ==========================================
+# 📮 OUTBOUND SEND SCHEDULER
+# ==========================================
+"""
+Every message, channel creation and channel deletion goes through here.
+
+Calls are grouped into buckets that match Discord's rate limits (one per
+channel for messages, one per guild for creating/deleting channels). Each
+bucket runs its calls one at a time, most important first, so a burst of
+tickets queues up smoothly instead of piling up 429 errors.
+
+Discord also limits the bot as a whole, not only per channel. So calls from
+all buckets then share MAX_IN_FLIGHT slots. When every slot is busy, the
+waiting calls get the next free slot by priority, so a report for the log
+channel goes ahead of questions queued in other ticket channels.
+"""
+
+# Lower number = sent first
+PRIORITY_LOG = 0      # Final reports in the log channels
+PRIORITY_CONTROL = 1  # Creating and deleting ticket channels
+PRIORITY_PROMPT = 2   # Questions and other chat messages
+PRIORITY_BACKGROUND = 3  # Housekeeping, like preparing spare ticket channels
+
+# How often a call is retried after Discord says "slow down" (HTTP 429)
+MAX_RETRIES = 3
+
+# Most Discord calls running at the same time, across all buckets
+MAX_IN_FLIGHT = int(os.getenv('SEND_MAX_IN_FLIGHT', 50))
+
+
+class SendScheduler:
+    """
+    Per-bucket priority queues, each drained by its own worker task,
+    sharing one priority-ordered set of in-flight slots.
+    """
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self.buckets = {}  # bucket key: list used as a heap
+        self.counter = itertools.count()  # Keeps equal priorities in arrival order
+        self.workers = set()  # Keeps the worker tasks alive until they finish
+
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0  # Calls running right now
+        self.waiting = []   # Heap of (priority, order, future) waiting for a slot
+
+        # Counters
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(self, bucket, make_call, priority=PRIORITY_PROMPT):
+        """
+        Queues `make_call` (a function returning a coroutine) in a bucket.
+        Returns a future with the result of the call.
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = (priority, next(self.counter), time.perf_counter(), make_call, future)
+
+        queue = self.buckets.get(bucket)
+        if queue is None:
+            # First job for this bucket: start a worker for it
+            queue = self.buckets[bucket] = []
+            heapq.heappush(queue, job)
+            worker = asyncio.create_task(self._drain(bucket, queue))
+            self.workers.add(worker)
+            worker.add_done_callback(self.workers.discard)
+        else:
+            heapq.heappush(queue, job)
+        return future
+
+    async def _drain(self, bucket, queue):
+        """Worker: runs the queued calls of one bucket, most important first."""
+        while queue:
+            priority, _, queued_at, make_call, future = heapq.heappop(queue)
+            if future.cancelled():
+                continue
+
+            wait = time.perf_counter() - queued_at
+            self.waits += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+            try:
+                result = await self._call(make_call, priority)
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.sent += 1
+                if not future.done():
+                    future.set_result(result)
+
+        # Queue is empty: remove the bucket so idle channels use no memory
+        del self.buckets[bucket]
+
+    async def _acquire(self, priority):
+        """Waits for a free in-flight slot. The most important waiting call gets the next one."""
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (priority, next(self.counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # The slot was already handed to us: pass it on
+            raise
+
+    def _release(self):
+        """Hands the slot to the most important waiting call, or frees it."""
+        while self.waiting:
+            _, _, waiter = heapq.heappop(self.waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _call(self, make_call, priority):
+        """Runs one call, backing off and retrying when rate limited."""
+        for attempt in range(MAX_RETRIES + 1):
+            await self._acquire(priority)
+            try:
+                return await make_call()
+            except discord.RateLimited as e:
+                error, delay = e, e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    raise
+                # Use Discord's Retry-After header when there is one
+                headers = getattr(e.response, "headers", None) or {}
+                error, delay = e, float(headers.get("Retry-After", 2 ** attempt))
+            finally:
+                self._release()  # Not held while backing off
+
+            if attempt == MAX_RETRIES:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    # --- Shortcuts used by the ticket logic ---
+
+    def send(self, channel, priority=PRIORITY_PROMPT, **kwargs):
+        """Queues `channel.send(**kwargs)` in the channel's bucket."""
+        files = list(kwargs.get("files") or ()) + ([kwargs["file"]] if kwargs.get("file") else [])
+
+        def call():
+            # A retry after a 429 must upload the files from the start again
+            # (discord.py has read them already and doesn't rewind on its first try)
+            for f in files:
+                f.reset()
+            return channel.send(**kwargs)
+        return self.submit(("channel", channel.id), call, priority)
+
+    def delete(self, channel, priority=PRIORITY_CONTROL):
+        """Queues `channel.delete()` in the guild's bucket."""
+        return self.submit(("guild", channel.guild.id), lambda: channel.delete(), priority)
+
+    def create_text_channel(self, guild, name, priority=PRIORITY_CONTROL, **kwargs):
+        """Queues `guild.create_text_channel(...)` in the guild's bucket."""
+        return self.submit(("guild", guild.id), lambda: guild.create_text_channel(name, **kwargs), priority)
+
+    def create_category(self, guild, name, priority=PRIORITY_CONTROL, **kwargs):
+        """Queues `guild.create_category(...)` in the guild's bucket."""
+        return self.submit(("guild", guild.id), lambda: guild.create_category(name, **kwargs), priority)
+
+    def queue_depth(self):
+        """Total number of calls waiting in all buckets."""
+        return sum(len(queue) for queue in self.buckets.values())
+
+    def stats(self):
+        """Returns the counters as a dictionary."""
+        return {
+            "queue_depth": self.queue_depth(),
+            "buckets": len(self.buckets),
+            "in_flight": self.in_flight,
+            "waiting_for_slot": len(self.waiting),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "avg_wait": self.total_wait / self.waits if self.waits else 0.0,
+            "max_wait": self.max_wait,
+        }
@@ -0,0 +1,77 @@
+import os
+
+# ==========================================
+# 🧩 SHARDING
+# ==========================================
+"""
+Splits the servers between several gateway connections (shards), so big
+bot networks aren't limited to one connection and one CPU core.
+
+- One process, several shards:   SHARD_COUNT=4
+- Several processes (one or more shards each), started like this:
+      SHARD_COUNT=4 SHARD_IDS=0,1 PORT=8080 python bot.py
+      SHARD_COUNT=4 SHARD_IDS=2,3 PORT=8081 python bot.py
+
+Discord decides which shard a server belongs to (see `shard_for`). The
+processes share their state through the SQLite files (cooldowns.db and
+interviews.db), so they must run on the same machine (or share a disk).
+Without SHARD_COUNT the bot runs one normal connection, like before.
+"""
+
+# Total number of shards ("auto" lets Discord pick). Empty = no sharding.
+SHARD_COUNT = os.getenv('SHARD_COUNT', '')
+
+# The shards this process runs, e.g. "0,1". Empty = all of them.
+SHARD_IDS = os.getenv('SHARD_IDS', '')
+
+
+def shard_for(guild_id, shard_count):
+    """The shard a server belongs to (Discord's own formula)."""
+    return (guild_id >> 22) % shard_count
+
+
+class ShardPlan:
+    """
+    Which shards this process runs.
+    """
+    def __init__(self, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS):
+        self.enabled = bool(shard_count)
+        self.shard_count = int(shard_count) if shard_count and shard_count != "auto" else None
+        self.shard_ids = [int(i) for i in shard_ids.split(",") if i.strip()] if shard_ids else None
+
+        if self.shard_ids is not None:
+            if self.shard_count is None:
+                raise ValueError("SHARD_IDS needs a fixed SHARD_COUNT")
+            bad = [i for i in self.shard_ids if not 0 <= i < self.shard_count]
+            if bad:
+                raise ValueError(f"SHARD_IDS {bad} are not between 0 and {self.shard_count - 1}")
+
+    @property
+    def multi_process(self):
+        """True if other processes run the other shards (state must then be shared)."""
+        return self.shard_ids is not None and len(self.shard_ids) < self.shard_count
+
+    def owns(self, guild_id):
+        """True if this process runs the shard of the server."""
+        if not self.multi_process:
+            return True
+        return shard_for(guild_id, self.shard_count) in self.shard_ids
+
+    def shard_of(self, guild_id):
+        """The shard of a server (0 when not sharded or the count is picked by Discord)."""
+        if not self.shard_count:
+            return 0
+        return shard_for(guild_id, self.shard_count)
+
+    def bot_options(self):
+        """Extra arguments for commands.AutoShardedBot."""
+        return {"shard_count": self.shard_count, "shard_ids": self.shard_ids}
+
+    def describe(self):
+        if not self.enabled:
+            return "no sharding"
+        shards = ",".join(map(str, self.shard_ids)) if self.shard_ids is not None else "all"
+        return f"shards {shards} of {self.shard_count or 'auto'}"
+
+
+SHARDS = ShardPlan()
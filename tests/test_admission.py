@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from admission import AdmissionController  # noqa: E402
+
+
+class AdmissionOrderTest(unittest.IsolatedAsyncioTestCase):
+    async def test_full_type_does_not_block_other_types(self):
+        admission = AdmissionController(max_per_type=1)
+        complaint = await admission.admit(1, "Complaint")
+
+        # A second Complaint has to wait for the first one...
+        waiting = asyncio.create_task(admission.admit(1, "Complaint"))
+        await asyncio.sleep(0)
+        self.assertEqual(admission.stats()["queue_depth"], 1)
+
+        # ...but a Bug ticket still has room and goes straight in
+        bug = await asyncio.wait_for(admission.admit(1, "Bug"), 1)
+        self.assertEqual(bug.ticket_type, "Bug")
+        self.assertFalse(waiting.done())
+
+        complaint.release()
+        second = await asyncio.wait_for(waiting, 1)
+        self.assertEqual(second.ticket_type, "Complaint")
+
+    async def test_same_type_keeps_its_place_in_line(self):
+        admission = AdmissionController(max_per_type=1)
+        first = await admission.admit(1, "Bug")
+        order = []
+
+        async def click(name):
+            slot = await admission.admit(1, "Bug")
+            order.append(name)
+            return slot
+
+        waiters = [asyncio.create_task(click("second")), asyncio.create_task(click("third"))]
+        await asyncio.sleep(0)
+        first.release()
+        (await asyncio.wait_for(waiters[0], 1)).release()
+        await asyncio.wait_for(waiters[1], 1)
+        self.assertEqual(order, ["second", "third"])
+
+
+if __name__ == "__main__":
+    unittest.main()